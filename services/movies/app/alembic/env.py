@@ -69,6 +69,9 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
+        # Trigram indexes of the movie search need the extension, which autogenerate does not track
+        connection.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
         context.configure(
             connection=connection, target_metadata=target_metadata
         )
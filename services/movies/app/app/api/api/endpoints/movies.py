@@ -1,13 +1,40 @@
-from typing import List, Any
+from typing import List, Any, Optional
 from uuid import UUID
 
 from app import schemas, crud
+from app.db.models.movie import Movie
 from app.api import deps
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.api.fast_json import FastJSONResponse, serialize_rows
+from app.core.config import settings
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+MOVIE_FIELDS = list(schemas.Movie.__fields__)
+MOVIE_COLUMNS = [getattr(Movie, field) for field in MOVIE_FIELDS]
+
+
+def read_movies_batch(db: Session, ids: List[UUID]) -> schemas.MoviesBatch:
+    if len(ids) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'At most {settings.BATCH_MAX_SIZE} movies can be read at once.'
+        )
+
+    ids = list(dict.fromkeys(ids))
+    movies = crud.movie.get_multi_by_ids(db, ids=ids)
+
+    return schemas.MoviesBatch(movies=[movies[id] for id in ids if id in movies],
+                               not_found=[id for id in ids if id not in movies])
+
+
+def build_next_cursor(movies: List[Movie], limit: int, sort_settings: schemas.SortingMovies) -> Optional[str]:
+    if not movies or len(movies) < limit:
+        return None
+
+    return schemas.MoviesCursor.after(movies[-1], sort_settings.sort, sort_settings.sort_dir).encode()
+
 
 @router.get("/",
             response_model=schemas.MoviesInfo
@@ -16,20 +43,112 @@ def read_movies(
         db: Session = Depends(deps.get_db),
         skip: int = 0,
         limit: int = 100,
-        sort_settings: schemas.SortingMovies = Depends(deps.check_movies_sorting)
+        sort_settings: schemas.SortingMovies = Depends(deps.check_movies_sorting),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve movies.
     """
     movies = crud.movie.get_multi_sort(db, skip=skip, limit=limit,
-                                       sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
+                                       sort=sort_settings.sort, sort_dir=sort_settings.sort_dir,
+                                       columns=MOVIE_COLUMNS if settings.FAST_RESPONSES else None)
+
+    total_count = crud.movie.count(db, mode=count)
+    info = schemas.Info(count=len(movies), totalCount=total_count)
+
+    if settings.FAST_RESPONSES:
+        return FastJSONResponse(dict(movies=serialize_rows(movies, MOVIE_FIELDS), info=info.dict(), next_cursor=None))
+
+    return schemas.MoviesInfo(movies=movies, info=info)
+
+
+@router.get("/filter", response_model=schemas.MoviesInfo)
+def filter_movies(
+        db: Session = Depends(deps.get_db),
+        movies_filter: schemas.MoviesFilter = Depends(deps.check_movies_filter),
+        skip: int = 0,
+        limit: int = 100,
+        sort_settings: schemas.SortingMovies = Depends(deps.check_movies_filter_sorting),
+        cursor: Optional[schemas.MoviesCursor] = Depends(deps.check_movies_cursor),
+        count: Optional[schemas.CountMode] = None
+) -> Any:
+    """
+    Retrieve movies matching all of the given criteria, newest first unless sorted otherwise.
+
+    Pass `next_cursor` of a page as `cursor` to get the next one, which unlike `skip`
+    stays fast however deep the page is.
+    """
+    movies = crud.movie.get_multi_filter(db, movies_filter=movies_filter, skip=skip, limit=limit,
+                                         sort=sort_settings.sort, sort_dir=sort_settings.sort_dir, cursor=cursor)
+
+    total_count = crud.movie.count_filter(db, movies_filter=movies_filter, mode=count)
+    info = schemas.Info(count=len(movies), totalCount=total_count)
+    next_cursor = build_next_cursor(movies, limit, sort_settings)
+
+    return schemas.MoviesInfo(movies=movies, info=info, next_cursor=next_cursor)
 
-    total_count = crud.movie.count(db)
+
+@router.get("/facets", response_model=schemas.MovieFacets)
+def read_movie_facets(
+        db: Session = Depends(deps.get_db),
+        movies_filter: schemas.MoviesFilter = Depends(deps.check_movies_filter),
+        limit: int = Query(settings.FACETS_LIMIT, ge=1)
+) -> Any:
+    """
+    Count movies per category, country, decade and director, among the movies matching the filter.
+    """
+    facets = crud.movie.get_facets(db, movies_filter=movies_filter, limit=limit)
+
+    return schemas.MovieFacets(
+        total=facets.total,
+        category=[schemas.FacetCount(value=value, count=count) for value, count in facets.category],
+        country=[schemas.FacetCount(value=value, count=count) for value, count in facets.country],
+        decade=[schemas.DecadeCount(decade=decade, count=count) for decade, count in facets.decade],
+        director=[schemas.FacetCount(value=value, count=count) for value, count in facets.director]
+    )
+
+
+@router.get("/search", response_model=schemas.MoviesInfo)
+def search_movies(
+        db: Session = Depends(deps.get_db),
+        q: str = Query(..., min_length=2),
+        skip: int = 0,
+        limit: int = 100,
+        count: Optional[schemas.CountMode] = None
+) -> Any:
+    """
+    Search movies by title, director or slug, tolerating typos. The best matches come first.
+    """
+    movies = crud.movie.search(db, q=q, skip=skip, limit=limit)
+
+    total_count = crud.movie.count_search(db, q=q, mode=count)
     info = schemas.Info(count=len(movies), totalCount=total_count)
 
     return schemas.MoviesInfo(movies=movies, info=info)
 
 
+@router.get("/batch", response_model=schemas.MoviesBatch)
+def read_movies_by_ids(
+        db: Session = Depends(deps.get_db),
+        id: List[UUID] = Query(...)
+) -> Any:
+    """
+    Retrieve many movies at once, in the order of `id`.
+    """
+    return read_movies_batch(db, id)
+
+
+@router.post("/batch", response_model=schemas.MoviesBatch)
+def read_movies_by_ids_in_body(
+        db: Session = Depends(deps.get_db),
+        ids: List[UUID] = Body(...)
+) -> Any:
+    """
+    Retrieve many movies at once, for lists of ids too long for a query string.
+    """
+    return read_movies_batch(db, ids)
+
+
 @router.get("/{movie_id}", response_model=schemas.Movie)
 def read_movie_by_id(
         movie_id: UUID,
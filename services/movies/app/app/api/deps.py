@@ -1,8 +1,8 @@
 from typing import Generator, Optional
 
 from app.db.session import SessionLocal
-from app.schemas import SortingDir, MoviesSortingModel, SortingMovies
-from fastapi import HTTPException, status
+from app.schemas import SortingDir, MoviesSortingModel, SortingMovies, MoviesFilter, MoviesCursor
+from fastapi import Depends, HTTPException, status
 
 
 def get_db() -> Generator:
@@ -28,3 +28,52 @@ def check_movies_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = N
 
     return SortingMovies(sort=None, sort_dir=None) if sort is None else\
         SortingMovies(sort=MoviesSortingModel(sort), sort_dir=SortingDir(sort_dir))
+
+
+def check_movies_filter_sorting(sort_settings: SortingMovies = Depends(check_movies_sorting)) -> SortingMovies:
+    # Filtered movies are always returned in a stable order, so that pages can be continued with a cursor
+    return SortingMovies(sort=MoviesSortingModel.year, sort_dir=SortingDir.desc) if sort_settings.sort is None \
+        else sort_settings
+
+
+def check_movies_filter(
+        category: Optional[str] = None,
+        country: Optional[str] = None,
+        director: Optional[str] = None,
+        year_gte: Optional[int] = None,
+        year_lte: Optional[int] = None
+) -> MoviesFilter:
+    if year_gte is not None and year_lte is not None and year_gte > year_lte:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid year range, year_gte is greater than year_lte.'
+        )
+
+    return MoviesFilter(category=category, country=country, director=director, year_gte=year_gte, year_lte=year_lte)
+
+
+def check_movies_cursor(
+        cursor: Optional[str] = None,
+        sort_settings: SortingMovies = Depends(check_movies_filter_sorting)
+) -> Optional[MoviesCursor]:
+    if cursor is None:
+        return None
+
+    try:
+        movies_cursor = MoviesCursor.decode(cursor)
+    except ValueError:
+        movies_cursor = None
+
+    if movies_cursor is None or getattr(movies_cursor, movies_cursor.sort.value) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor.'
+        )
+
+    if movies_cursor.sort != sort_settings.sort or movies_cursor.sort_dir != sort_settings.sort_dir:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Cursor was issued for a different sorting method.'
+        )
+
+    return movies_cursor
@@ -0,0 +1,48 @@
+import logging
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+URL = f"{settings.API_MOVIES}/?sort=title&sort_dir=asc&limit=100&count=none"
+
+
+def benchmark(client: TestClient, requests: int) -> float:
+    """
+    Requests served per second of CPU time of this process, which runs both the client and the app.
+    """
+    client.get(URL).raise_for_status()
+
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(URL)
+
+    return requests / (time.process_time() - start)
+
+
+def main() -> None:
+    """
+    Compare requests per core of `GET /movies` (a page of 100) with and without `FAST_RESPONSES`.
+
+    Usage: python -m app.benchmark_responses [requests]
+    """
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with TestClient(app) as client:
+        settings.FAST_RESPONSES = False
+        validated = benchmark(client, requests)
+        settings.FAST_RESPONSES = True
+        fast = benchmark(client, requests)
+
+    logger.info(f"response_model: {validated:.1f} requests/s per core")
+    logger.info(f"FAST_RESPONSES: {fast:.1f} requests/s per core ({fast / validated:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import logging
+
+from app.crud.catalog import movie_catalog
+from app.db import base  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    if not movie_catalog:
+        logger.info("Movie catalog snapshot is disabled")
+        return
+
+    logger.info("Building movie catalog snapshot")
+    movie_catalog.rebuild()
+    logger.info(f"Movie catalog snapshot built at {movie_catalog.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,29 @@ class Settings(BaseSettings):
     POOL_MAX_OVERFLOW: int
     POOL_TIMEOUT: int
 
+    # Seconds for which total counts of list endpoints are cached with count=cached
+    COUNT_CACHE_TTL: int = 60
+
+    # Maximal number of ids looked up by a single batch request
+    BATCH_MAX_SIZE: int = 1000
+
+    # Serve list endpoints from plain rows encoded by orjson, skipping the validation against `response_model`
+    FAST_RESPONSES: bool = False
+
+    # Matches of every searched column ranked by the movie search
+    SEARCH_CANDIDATES: int = 100
+
+    # Movie facets: seconds for which counts are cached, number of cached filters
+    # and default number of values returned per facet
+    FACETS_CACHE_TTL: int = 300
+    FACETS_CACHE_SIZE: int = 256
+    FACETS_LIMIT: int = 20
+
+    # Serve movies by id and sorted listings from a snapshot of the catalog shared by the workers
+    # in a memory-mapped file, instead of the database
+    CATALOG_SNAPSHOT: bool = False
+    CATALOG_SNAPSHOT_PATH: str = '/dev/shm/movies-catalog'
+
     class Config:
         case_sensitive = True
 
@@ -26,6 +26,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
 
+    def get_multi_by_ids(self, db: Session, *, ids: List[Any]) -> Dict[Any, ModelType]:
+        return {obj.id: obj for obj in db.query(self.model).filter(self.model.id.in_(ids)).all()}
+
     def get_multi(
             self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
@@ -0,0 +1,237 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.models.movie import Movie
+from app.db.session import engine
+from app.schemas import SortingDir, MoviesSortingModel
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MOVCAT01'
+
+STRING_COLUMNS = ['title', 'poster_url', 'background_url', 'director', 'country', 'category', 'slug']
+
+# Read by the endpoints like a `Movie` row
+CatalogMovie = namedtuple('CatalogMovie', ['id', 'year', *STRING_COLUMNS])
+
+# Magic, number of movies, then the offset of every section: ids, years, for every string column
+# its offsets, null flags and UTF-8 text, and for every `MoviesSortingModel` the sorted row numbers
+SECTIONS = 2 + 3 * len(STRING_COLUMNS) + len(MoviesSortingModel)
+HEADER = struct.Struct(f'<8sI{SECTIONS}Q')
+
+
+def align(data: bytes) -> bytes:
+    # Sections start at multiples of 8, so that they can be cast to arrays of any width
+    return data + b'\0' * (-len(data) % 8)
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a snapshot file. Rows are ordered by id and columns are stored one after
+    another, so a movie is found by a binary search over the ids and a page of a sorted listing
+    is a slice of the row numbers sorted for that `MoviesSortingModel`.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self.stat = os.fstat(file.fileno())
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._mmap)
+        magic, self.size, *offsets = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a movie catalog snapshot')
+
+        sections = [buffer[start:end] for start, end in zip(offsets, offsets[1:] + [len(buffer)])]
+        self._ids = sections[0][:16 * self.size]
+        self._years = sections[1].cast('i')[:self.size]
+        self._strings = {}
+        for i, column in enumerate(STRING_COLUMNS):
+            string_offsets, nulls, text = sections[2 + 3 * i:5 + 3 * i]
+            self._strings[column] = (string_offsets.cast('I')[:self.size + 1], nulls[:self.size], text)
+        self._sorted = {sort: sections[2 + 3 * len(STRING_COLUMNS) + i].cast('I')[:self.size]
+                        for i, sort in enumerate(MoviesSortingModel)}
+
+    def movie(self, row: int) -> CatalogMovie:
+        strings = {}
+        for column, (string_offsets, nulls, text) in self._strings.items():
+            strings[column] = None if nulls[row] else \
+                str(text[string_offsets[row]:string_offsets[row + 1]], 'utf-8')
+
+        return CatalogMovie(id=UUID(bytes=bytes(self._ids[16 * row:16 * row + 16])), year=self._years[row],
+                            **strings)
+
+    def find(self, id: UUID) -> Optional[int]:
+        key = id.bytes
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self._ids[16 * middle:16 * middle + 16]) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low if low < self.size and self._ids[16 * low:16 * low + 16] == key else None
+
+    def page(self, *, skip: int, limit: int, sort: Optional[MoviesSortingModel],
+             sort_dir: Optional[SortingDir]) -> List[CatalogMovie]:
+        if sort is None:
+            return [self.movie(row) for row in range(skip, min(skip + limit, self.size))]
+
+        rows = self._sorted[sort]
+        if sort_dir == SortingDir.desc:
+            stop = self.size - skip
+            rows = reversed(rows[max(stop - limit, 0):max(stop, 0)])
+        else:
+            rows = rows[skip:skip + limit]
+
+        return [self.movie(row) for row in rows]
+
+
+class MovieCatalog:
+    def __init__(self, *, path: str):
+        """
+        Snapshot of the movie catalog in a memory-mapped file, shared by the workers of the service.
+
+        **Parameters**
+
+        * `path`: Snapshot file, preferably on a tmpfs such as /dev/shm
+
+        A worker creating a movie marks the snapshot stale and rebuilds it in a background thread into
+        a temporary file, which then atomically replaces the old one. Until then movies by id missing
+        from a stale snapshot are read from the database, while listings lag behind. Readers notice
+        the replacement by the inode of the file and map the new one, whatever they have already mapped
+        stays valid until they drop it.
+        """
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._pending = False
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        stat = os.stat(self.path)
+
+        if snapshot is None or (snapshot.stat.st_ino, snapshot.stat.st_dev) != (stat.st_ino, stat.st_dev):
+            snapshot = self._snapshot = CatalogSnapshot(self.path)
+
+        return snapshot
+
+    def is_stale(self) -> bool:
+        # A snapshot is modified at the time its build started reading, so it holds every movie
+        # committed before that, and is stale when a movie was created since
+        try:
+            marked = os.stat(self.path + '.stale').st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        try:
+            return marked >= os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+
+    def mark_stale(self) -> None:
+        with open(self.path + '.stale', 'a'):
+            os.utime(self.path + '.stale')
+
+        # One rebuild at a time per worker, marks made during it are covered by one more rebuild
+        with self._lock:
+            if self._rebuilding:
+                self._pending = True
+                return
+            self._rebuilding = True
+
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def ensure_built(self) -> None:
+        if not os.path.exists(self.path):
+            self.rebuild()
+
+    def rebuild(self, *, only_if_stale: bool = False) -> None:
+        # Rebuilds are serialized, so the last one reads every committed movie and no older snapshot can win
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if only_if_stale and not self.is_stale():
+                return
+
+            temporary_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                started = time.time_ns()
+                with open(temporary_path, 'wb') as file:
+                    file.write(self._build())
+                os.utime(temporary_path, ns=(started, started))
+                os.replace(temporary_path, self.path)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+
+    def _rebuild_in_background(self) -> None:
+        while True:
+            try:
+                # Another worker may have rebuilt the snapshot while this one waited for the lock
+                self.rebuild(only_if_stale=True)
+            except Exception:
+                logger.exception('Could not rebuild the movie catalog snapshot')
+
+            with self._lock:
+                if not self._pending:
+                    self._rebuilding = False
+                    return
+                self._pending = False
+
+    @staticmethod
+    def _build() -> bytes:
+        # Row numbers of every movie in each sorted listing, sorted by the database so that they match
+        # listings read from it. Movie id breaks ties between equal keys.
+        ranks = [func.row_number().over(order_by=[getattr(Movie, sort.value), Movie.id]) - 1
+                 for sort in MoviesSortingModel]
+        stmt = select([func.uuid_send(Movie.id), Movie.year, *(getattr(Movie, column) for column in STRING_COLUMNS),
+                       *ranks]).order_by(Movie.id)
+
+        with engine.connect() as connection:
+            # Rows are fetched from the DBAPI cursor, building result rows would take longer than the query
+            rows = connection.execute(stmt).cursor.fetchall()
+
+        ids, years, *columns = zip(*rows) if rows else [()] * (2 + len(STRING_COLUMNS) + len(ranks))
+        strings, ranks = columns[:len(STRING_COLUMNS)], columns[len(STRING_COLUMNS):]
+
+        sections = [b''.join(ids), array('i', years).tobytes()]
+        for values in strings:
+            encoded = [value.encode() if value is not None else b'' for value in values]
+
+            string_offsets = array('I', [0])
+            for value in encoded:
+                string_offsets.append(string_offsets[-1] + len(value))
+
+            sections += [string_offsets.tobytes(), bytes(value is None for value in values), b''.join(encoded)]
+
+        for ranks_of_sort in ranks:
+            sorted_rows = array('I', bytes(4 * len(rows)))
+            for row, rank in enumerate(ranks_of_sort):
+                sorted_rows[rank] = row
+            sections.append(sorted_rows.tobytes())
+
+        offsets = []
+        position = len(align(bytes(HEADER.size)))
+        for i, section in enumerate(sections):
+            sections[i] = align(section)
+            offsets.append(position)
+            position += len(sections[i])
+
+        return b''.join([align(HEADER.pack(MAGIC, len(rows), *offsets)), *sections])
+
+
+movie_catalog = MovieCatalog(path=settings.CATALOG_SNAPSHOT_PATH) if settings.CATALOG_SNAPSHOT else None
@@ -1,11 +1,23 @@
-from typing import List
+from typing import Any, List, Optional
 
+import sqlalchemy
 from slugify import slugify
-from sqlalchemy import func
+from sqlalchemy import func, or_, select, union, tuple_
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.crud.base import CRUDBase
+from app.crud.catalog import movie_catalog
+from app.crud.facets import movie_facets, FacetCounts
+from app.crud.total_count import TotalCounter, estimate_count
 from app.db.models.movie import Movie
-from app.schemas import MovieCreate, MovieUpdate, SortingDir, MoviesSortingModel
+from app.schemas import MovieCreate, MovieUpdate, SortingDir, MoviesSortingModel, MoviesFilter, MoviesCursor, \
+    CountMode
+
+# Totals of whole tables may lag behind by COUNT_CACHE_TTL, unless asked for with count=exact
+movies_counter = TotalCounter(default_mode=CountMode.cached, ttl=settings.COUNT_CACHE_TTL)
+filtered_movies_counter = TotalCounter(default_mode=CountMode.estimate, ttl=settings.COUNT_CACHE_TTL)
+# Search results are ranked rather than paged through, so they are not counted unless asked for
+search_counter = TotalCounter(default_mode=CountMode.none)
 
 
 def determine_movies_sorting_type(sort: MoviesSortingModel, sort_dir: SortingDir):
@@ -25,7 +37,90 @@ def determine_movies_sorting_type(sort: MoviesSortingModel, sort_dir: SortingDir
     return sorting_method
 
 
+def determine_movies_sorting_key(sort: MoviesSortingModel):
+    return getattr(Movie, sort.value)
+
+
+def determine_movies_keyset_sorting(sort: MoviesSortingModel, sort_dir: SortingDir):
+    # Movie id breaks ties between equal keys, which keeps the order stable for cursors
+    key = determine_movies_sorting_key(sort)
+
+    if sort_dir == SortingDir.asc:
+        return [key.asc(), Movie.id.asc()]
+    else:
+        return [key.desc(), Movie.id.desc()]
+
+
+def determine_movies_keyset_filter(cursor: MoviesCursor):
+    key = determine_movies_sorting_key(cursor.sort)
+    value = getattr(cursor, cursor.sort.value)
+
+    if cursor.sort_dir == SortingDir.asc:
+        return tuple_(key, Movie.id) > tuple_(value, cursor.id)
+    else:
+        return tuple_(key, Movie.id) < tuple_(value, cursor.id)
+
+
+def determine_movies_filters(movies_filter: MoviesFilter):
+    filters = []
+
+    if movies_filter.category is not None:
+        filters.append(Movie.category == movies_filter.category)
+    if movies_filter.country is not None:
+        filters.append(Movie.country == movies_filter.country)
+    if movies_filter.director is not None:
+        filters.append(Movie.director == movies_filter.director)
+    if movies_filter.year_gte is not None:
+        filters.append(Movie.year >= movies_filter.year_gte)
+    if movies_filter.year_lte is not None:
+        filters.append(Movie.year <= movies_filter.year_lte)
+
+    return filters
+
+
+# pg_trgm word similarity, served by the trigram indexes: the value is similar to some word sequence of the column.
+# SQLAlchemy escapes `%` in custom operators for pyformat drivers from 1.4 on, under 1.3 it is escaped here
+WORD_SIMILAR = '%>' if tuple(int(part) for part in sqlalchemy.__version__.split('.')[:2]) >= (1, 4) else '%%>'
+
+
+def determine_search_filters(q: str):
+    return [Movie.title.op(WORD_SIMILAR, is_comparison=True)(q),
+            Movie.director.op(WORD_SIMILAR, is_comparison=True)(q),
+            Movie.slug.op(WORD_SIMILAR, is_comparison=True)(slugify(q))]
+
+
+def determine_search_candidates(q: str, limit: int):
+    """
+    Ids of at most `limit` matches of every searched column, which are then ranked.
+
+    Ranking every match of a common word would read a large share of the catalog, so only the first
+    `limit` matches of each column are ranked. Queries matching fewer movies are ranked exactly.
+
+    The matches are selected in MATERIALIZED CTEs: given a LIMIT, the planner expects to find the
+    matches early in a sequential scan, which reads the whole table for rare words.
+    """
+    matches = (select([Movie.id]).where(search_filter).cte(f'search_{i}').prefix_with('MATERIALIZED')
+               for i, search_filter in enumerate(determine_search_filters(q)))
+    return union(*(select([match.c.id]).limit(limit) for match in matches))
+
+
+def determine_search_rank(q: str):
+    return func.greatest(func.word_similarity(q, Movie.title), func.word_similarity(q, Movie.director),
+                         func.word_similarity(slugify(q), Movie.slug))
+
+
 class CRUDMovie(CRUDBase[Movie, MovieCreate, MovieUpdate]):
+    def get(self, db: Session, id: Any) -> Optional[Movie]:
+        if movie_catalog:
+            snapshot = movie_catalog.get()
+            row = snapshot.find(id)
+            if row is not None:
+                return snapshot.movie(row)
+            if not movie_catalog.is_stale():
+                return None
+
+        return super().get(db, id)
+
     def get_by_title(self, db: Session, *, title: str) -> List[Movie]:
         return db.query(self.model).filter(Movie.title == title).all()
 
@@ -39,12 +134,67 @@ class CRUDMovie(CRUDBase[Movie, MovieCreate, MovieUpdate]):
         return db.query(self.model).filter(Movie.country == country).all()
 
     def get_multi_sort(self, db: Session, *, skip: int = 0, limit: int = 100,
-                       sort: MoviesSortingModel, sort_dir: SortingDir):
-        return db.query(self.model).order_by(determine_movies_sorting_type(sort, sort_dir)) \
+                       sort: MoviesSortingModel, sort_dir: SortingDir, columns: Optional[List] = None):
+        if movie_catalog:
+            return movie_catalog.get().page(skip=skip, limit=limit, sort=sort, sort_dir=sort_dir)
+
+        # Selected `columns` are returned as plain tuples, which are cheaper to load than `Movie` objects
+        return db.query(*(columns or [self.model])).order_by(determine_movies_sorting_type(sort, sort_dir)) \
+            .offset(skip).limit(limit).all()
+
+    def get_multi_filter(self, db: Session, *, movies_filter: MoviesFilter, skip: int = 0, limit: int = 100,
+                         sort: MoviesSortingModel, sort_dir: SortingDir,
+                         cursor: Optional[MoviesCursor] = None) -> List[Movie]:
+        query = db.query(self.model).filter(*determine_movies_filters(movies_filter)) \
+            .order_by(*determine_movies_keyset_sorting(sort, sort_dir))
+
+        if cursor:
+            query = query.filter(determine_movies_keyset_filter(cursor))
+        else:
+            query = query.offset(skip)
+
+        return query.limit(limit).all()
+
+    def count_filter(self, db: Session, *, movies_filter: MoviesFilter,
+                     mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(Movie.id).filter(*determine_movies_filters(movies_filter))
+
+        return filtered_movies_counter.count(
+            mode=mode,
+            key=tuple(movies_filter.dict().values()),
+            exact=lambda: query.with_entities(func.count(Movie.id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
+
+    def get_facets(self, db: Session, *, movies_filter: MoviesFilter, limit: int) -> FacetCounts:
+        return movie_facets.get(db, movies_filter=movies_filter, filters=determine_movies_filters(movies_filter),
+                                limit=limit)
+
+    def search(self, db: Session, *, q: str, skip: int = 0, limit: int = 100) -> List[Movie]:
+        candidates = determine_search_candidates(q, max(skip + limit, settings.SEARCH_CANDIDATES))
+
+        return db.query(self.model).filter(Movie.id.in_(candidates)) \
+            .order_by(determine_search_rank(q).desc(), Movie.title, Movie.id) \
             .offset(skip).limit(limit).all()
 
-    def count(self, db: Session) -> int:
-        return db.query(func.count(Movie.id)).first()[0]
+    def count_search(self, db: Session, *, q: str, mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(Movie.id).filter(or_(*determine_search_filters(q)))
+
+        return search_counter.count(
+            mode=mode,
+            exact=lambda: query.with_entities(func.count(Movie.id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
+
+    def count(self, db: Session, *, mode: Optional[CountMode] = None) -> Optional[int]:
+        if movie_catalog:
+            return None if (mode or movies_counter.default_mode) == CountMode.none else movie_catalog.get().size
+
+        return movies_counter.count(
+            mode=mode,
+            exact=lambda: db.query(func.count(Movie.id)).first()[0],
+            estimate=lambda: estimate_count(db, db.query(Movie.id))
+        )
 
     def create(self, db: Session, *, obj_in: MovieCreate) -> Movie:
         slug = slugify(obj_in.title)
@@ -60,7 +210,12 @@ class CRUDMovie(CRUDBase[Movie, MovieCreate, MovieUpdate]):
         )
         db.add(db_obj)
         db.commit()
+        movies_counter.invalidate()
+        filtered_movies_counter.invalidate()
         db.refresh(db_obj)
+        movie_facets.add(db_obj)
+        if movie_catalog:
+            movie_catalog.mark_stale()
         return db_obj
 
 
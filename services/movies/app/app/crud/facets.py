@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, List
+
+from sqlalchemy import and_, collate, func, literal_column, select, true
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.movie import Movie
+from app.schemas import MoviesFilter
+
+# Facets ranked by count, decades are few and listed in chronological order instead
+RANKED_FACETS = ['category', 'country', 'director']
+
+# (value, count) pairs of every facet
+FacetCounts = namedtuple('FacetCounts', ['total', 'category', 'country', 'decade', 'director'])
+
+
+def decade_of(year: int) -> int:
+    return year // 10 * 10
+
+
+def matches_filter(movies_filter: MoviesFilter, movie: Movie) -> bool:
+    return (movies_filter.category is None or movie.category == movies_filter.category) and \
+           (movies_filter.country is None or movie.country == movies_filter.country) and \
+           (movies_filter.director is None or movie.director == movies_filter.director) and \
+           (movies_filter.year_gte is None or movie.year >= movies_filter.year_gte) and \
+           (movies_filter.year_lte is None or movie.year <= movies_filter.year_lte)
+
+
+class FacetRanking:
+    """
+    Counts of the values of a facet, together with the values ranked by count (descending) and value.
+    """
+
+    def __init__(self, rows):
+        # `rows` of (value, count) already ranked, which saves sorting a facet with many values
+        self.counts = dict(rows)
+        self.ranked = [(-count, value) for value, count in rows]
+
+    def increment(self, value) -> None:
+        count = self.counts.get(value, 0)
+        if count:
+            del self.ranked[bisect.bisect_left(self.ranked, (-count, value))]
+
+        self.counts[value] = count + 1
+        bisect.insort(self.ranked, (-count - 1, value))
+
+    def top(self, limit: int) -> List:
+        return [(value, -count) for count, value in self.ranked[:limit]]
+
+
+class MovieFacets:
+    def __init__(self, *, ttl: float, max_size: int):
+        """
+        Numbers of movies per category, country, decade and director, kept in memory of the worker.
+
+        **Parameters**
+
+        * `ttl`: Seconds after which counts are read again, catching up with movies added by other workers
+        * `max_size`: Maximal number of cached filters
+
+        Counts are computed by a single GROUPING SETS query per filter. Movies created by this
+        worker are added to the cached counts of every filter they match, instead of dropping them,
+        which costs O(log n) per facet.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, *, movies_filter: MoviesFilter, filters: List, limit: int) -> FacetCounts:
+        """
+        Counts of the movies matching `movies_filter`, whose SQL form is `filters`.
+        Only the `limit` most frequent values of the ranked facets are returned.
+        """
+        key = tuple(movies_filter.dict().values())
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached['expires'] > now:
+                self._cache.move_to_end(key)
+                return self._top(cached, limit)
+            generation = self._generation
+
+        entry = self._count(db, filters)
+        entry.update(movies_filter=movies_filter, expires=now + self.ttl)
+
+        with self._lock:
+            # Counts computed while a movie was being added may or may not include it
+            if generation == self._generation:
+                self._cache[key] = entry
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+            return self._top(entry, limit)
+
+    def add(self, movie: Movie) -> None:
+        with self._lock:
+            self._generation += 1
+            for entry in self._cache.values():
+                if matches_filter(entry['movies_filter'], movie):
+                    entry['total'] += 1
+                    decade = decade_of(movie.year)
+                    entry['decade'][decade] = entry['decade'].get(decade, 0) + 1
+                    for facet in RANKED_FACETS:
+                        entry[facet].increment(getattr(movie, facet))
+
+    @staticmethod
+    def _count(db: Session, filters: List) -> Dict:
+        decade = (Movie.year / 10 * 10).label('decade')
+        count = func.count().label('count')
+        columns = [Movie.category, Movie.country, decade, Movie.director]
+
+        # GROUPING() has a bit set for every column the row is not grouped by, the first column being the highest
+        grouping = func.grouping(*columns).label('grouping')
+        facets = {0b0111: 'category', 0b1011: 'country', 0b1101: 'decade', 0b1110: 'director'}
+        positions = dict(category=1, country=2, decade=3, director=4)
+
+        # Values are ranked in the byte order of the "C" collation, which matches the ordering of Python strings
+        value = func.coalesce(Movie.category, Movie.country, Movie.director)
+        stmt = select([grouping, *columns, count]).where(and_(true(), *filters)) \
+            .group_by(func.grouping_sets(*columns)) \
+            .order_by(literal_column('grouping'), count.desc(), collate(value, 'C'))
+
+        rows = {facet: [] for facet in facets.values()}
+        for row in db.execute(stmt).fetchall():
+            facet = facets[row[0]]
+            rows[facet].append((row[positions[facet]], row[-1]))
+
+        return dict(total=sum(count for _, count in rows['category']),
+                    decade=dict(rows['decade']),
+                    **{facet: FacetRanking(rows[facet]) for facet in RANKED_FACETS})
+
+    @staticmethod
+    def _top(entry: Dict, limit: int) -> FacetCounts:
+        return FacetCounts(total=entry['total'], decade=sorted(entry['decade'].items()),
+                           **{facet: entry[facet].top(limit) for facet in RANKED_FACETS})
+
+
+movie_facets = MovieFacets(ttl=settings.FACETS_CACHE_TTL, max_size=settings.FACETS_CACHE_SIZE)
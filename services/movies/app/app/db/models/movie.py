@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 
 from app.db.base_class import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -15,3 +15,21 @@ class Movie(Base):
     country = Column(String, index=True, nullable=False)
     category = Column(String, index=True, nullable=False)
     slug = Column(String, index=True, nullable=False)
+
+    # Trigram indexes serving the fuzzy search (requires the pg_trgm extension)
+    __table_args__ = (
+        Index('ix_movie_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_movie_director_trgm', 'director', postgresql_using='gin',
+              postgresql_ops={'director': 'gin_trgm_ops'}),
+        Index('ix_movie_slug_trgm', 'slug', postgresql_using='gin', postgresql_ops={'slug': 'gin_trgm_ops'}),
+
+        # Equality filters of `/movies/filter` followed by the default sorting key and the id,
+        # so that a filtered page is read in index order, continuing right after the cursor
+        Index('ix_movie_year_id', 'year', 'id'),
+        Index('ix_movie_category_year_id', 'category', 'year', 'id'),
+        Index('ix_movie_country_year_id', 'country', 'year', 'id'),
+        Index('ix_movie_director_year_id', 'director', 'year', 'id'),
+        Index('ix_movie_category_country_year_id', 'category', 'country', 'year', 'id'),
+        Index('ix_movie_title_id', 'title', 'id'),
+        Index('ix_movie_category_title_id', 'category', 'title', 'id'),
+    )
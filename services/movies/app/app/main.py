@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.api.api import api_router
+from app.crud.catalog import movie_catalog
 
 app = FastAPI(title=settings.SERVICE_NAME,
               openapi_url=f"{settings.API_MOVIES}/openapi.json")
@@ -24,3 +25,10 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix=settings.API_MOVIES)
+
+
+@app.on_event("startup")
+def map_movie_catalog():
+    # The snapshot is rebuilt by prestart.sh, workers only build it when it is missing
+    if movie_catalog:
+        movie_catalog.ensure_built()
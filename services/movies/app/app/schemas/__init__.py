@@ -1,3 +1,7 @@
-from .movie import Movie, MovieCreate, MovieUpdate, MoviesInfo, Info
+from .movie import Movie, MovieCreate, MovieUpdate, MoviesInfo, MoviesBatch, Info
 from .sorting import SortingDir
+from .count import CountMode
 from .sorting_movies import MoviesSortingModel, SortingMovies
+from .movie_filter import MoviesFilter
+from .cursor import MoviesCursor
+from .facets import FacetCount, DecadeCount, MovieFacets
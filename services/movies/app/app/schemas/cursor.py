@@ -0,0 +1,36 @@
+import base64
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.schemas import SortingDir, MoviesSortingModel
+
+
+class MoviesCursor(BaseModel):
+    """
+    Position right after the last movie of a page, opaque to the clients.
+
+    Holds the value of the sorting key together with the movie id,
+    which breaks ties between movies with equal keys.
+    """
+    sort: MoviesSortingModel
+    sort_dir: SortingDir
+    year: Optional[int]
+    title: Optional[str]
+    country: Optional[str]
+    director: Optional[str]
+    category: Optional[str]
+    id: UUID
+
+    @classmethod
+    def after(cls, movie, sort: MoviesSortingModel, sort_dir: SortingDir) -> 'MoviesCursor':
+        return cls(sort=sort, sort_dir=sort_dir, id=movie.id, **{sort.value: getattr(movie, sort.value)})
+
+    @classmethod
+    def decode(cls, token: str) -> 'MoviesCursor':
+        padding = '=' * (-len(token) % 4)
+        return cls.parse_raw(base64.urlsafe_b64decode(token + padding))
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.json(exclude_none=True).encode()).decode().rstrip('=')
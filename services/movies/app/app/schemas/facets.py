@@ -0,0 +1,25 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class DecadeCount(BaseModel):
+    decade: int
+    count: int
+
+
+class MovieFacets(BaseModel):
+    """
+    Numbers of movies per facet value. Category, country and director values are the most
+    frequent first and cut to the requested limit, decades are all listed in chronological order.
+    """
+    total: int
+    category: List[FacetCount]
+    country: List[FacetCount]
+    decade: List[DecadeCount]
+    director: List[FacetCount]
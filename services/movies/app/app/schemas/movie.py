@@ -6,7 +6,7 @@ from uuid import UUID
 
 class Info(BaseModel):
     count: int
-    totalCount: int
+    totalCount: Optional[int]
 
 
 class MovieBase(BaseModel):
@@ -38,6 +38,12 @@ class Movie(MovieBase):
 class MoviesInfo(BaseModel):
     movies: List[Movie]
     info: Info
+    next_cursor: Optional[str] = None
 
     class Config:
         orm_mode = True
+
+
+class MoviesBatch(BaseModel):
+    movies: List[Movie]
+    not_found: List[UUID]
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class MoviesFilter(BaseModel):
+    """
+    Criteria of `/movies/filter`, all of which have to match. The year range is inclusive.
+    """
+    category: Optional[str]
+    country: Optional[str]
+    director: Optional[str]
+    year_gte: Optional[int]
+    year_lte: Optional[int]
@@ -7,4 +7,7 @@ python /app/app/movie_pre_start.py
 alembic upgrade head
 
 # Create initial data in DB
-python /app/app/initial_data.py
\ No newline at end of file
+python /app/app/initial_data.py
+
+# Build the movie catalog snapshot, if enabled
+python /app/app/build_catalog.py
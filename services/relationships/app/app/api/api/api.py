@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.api.api.endpoints import relationships
+from app.api.api.endpoints import relationships, metrics
 
 api_router = APIRouter()
 api_router.include_router(relationships.router, tags=["relationships"])
+api_router.include_router(metrics.router, tags=["metrics"])
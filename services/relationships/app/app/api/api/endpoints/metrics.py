@@ -0,0 +1,17 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app import schemas
+from app.db.routing import shard_routing
+
+router = APIRouter()
+
+
+@router.get("/metrics/shards", response_model=schemas.ShardRoutingMetrics)
+def read_shard_metrics() -> Any:
+    """
+    Shards contacted by the queries of this worker: number of queries by number of contacted shards
+    (`fan_out`) and by shard.
+    """
+    return shard_routing.metrics()
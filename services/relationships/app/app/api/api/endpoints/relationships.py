@@ -1,4 +1,4 @@
-from typing import List, Any
+from typing import List, Any, Optional
 from uuid import UUID
 
 from app import schemas, crud
@@ -9,6 +9,15 @@ from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+
+def build_next_cursor(relationships: List[models.Follower], limit: int,
+                      sort_settings: schemas.SortingRelationships) -> Optional[str]:
+    if not relationships or len(relationships) < limit:
+        return None
+
+    return schemas.FollowersCursor.after(relationships[-1], sort_settings.sort_dir).encode()
+
+
 @router.get("/following/{user_id}",
             response_model=schemas.RelationshipsInfo
             )
@@ -17,18 +26,24 @@ def read_user_followers(
         db: Session = Depends(deps.get_db),
         skip: int = 0,
         limit: int = 100,
-        sort_settings: schemas.SortingRelationships = Depends(deps.check_relationships_sorting)
+        sort_settings: schemas.SortingRelationships = Depends(deps.check_followers_sorting),
+        cursor: Optional[schemas.FollowersCursor] = Depends(deps.check_followers_cursor),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve users following user_id.
+
+    Pass `next_cursor` of a page as `cursor` to get the following page, `skip` is then ignored.
     """
     relationships = crud.relationship.get_user_followers(db=db, user_id=user_id, skip=skip, limit=limit,
-                                                         sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
+                                                         sort=sort_settings.sort, sort_dir=sort_settings.sort_dir,
+                                                         cursor=cursor)
 
-    total_count = crud.relationship.count_user_followers(db=db, user_id=user_id)
+    total_count = crud.relationship.count_user_followers(db=db, user_id=user_id, mode=count)
     info = schemas.Info(count=len(relationships), totalCount=total_count)
+    next_cursor = build_next_cursor(relationships, limit, sort_settings)
 
-    return schemas.RelationshipsInfo(relationships=relationships, info=info)
+    return schemas.RelationshipsInfo(relationships=relationships, info=info, next_cursor=next_cursor)
 
 
 @router.get("/followed-by/{user_id}",
@@ -39,7 +54,8 @@ def read_following_by_user(
         db: Session = Depends(deps.get_db),
         skip: int = 0,
         limit: int = 100,
-        sort_settings: schemas.SortingRelationships = Depends(deps.check_relationships_sorting)
+        sort_settings: schemas.SortingRelationships = Depends(deps.check_relationships_sorting),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve following by user_id.
@@ -47,7 +63,7 @@ def read_following_by_user(
     relationships = crud.relationship.get_following_by_user(db=db, user_id=user_id, skip=skip, limit=limit,
                                                             sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
 
-    total_count = crud.relationship.count_following_by_user(db=db, user_id=user_id)
+    total_count = crud.relationship.count_following_by_user(db=db, user_id=user_id, mode=count)
     info = schemas.Info(count=len(relationships), totalCount=total_count)
 
     return schemas.RelationshipsInfo(relationships=relationships, info=info)
@@ -1,8 +1,18 @@
 from typing import Generator, Optional
 
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError
+from pydantic import ValidationError
+
+from app.core.auth import jwks_verifier
+from app.core.config import settings
 from app.db.session import SessionLocal
-from app.schemas import SortingDir, RelationshipsSortingModel, SortingRelationships
+from app.schemas import SortingDir, RelationshipsSortingModel, SortingRelationships, TokenPayload, FollowersCursor
+
+reusable_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_USERS}/login/access-token"
+)
 
 
 def get_db() -> Generator:
@@ -13,6 +23,17 @@ def get_db() -> Generator:
         db.close()
 
 
+def get_token_payload(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+    # Verified with the cached public keys of the users service, without a request to it
+    try:
+        return TokenPayload(**jwks_verifier.decode(token))
+    except (JWTError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+
 def check_relationships_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = None):
     try:
         if sort:
@@ -28,3 +49,35 @@ def check_relationships_sorting(sort: Optional[str] = None, sort_dir: Optional[s
 
     return SortingRelationships(sort=None, sort_dir=None) if sort is None else\
         SortingRelationships(sort=RelationshipsSortingModel(sort), sort_dir=SortingDir(sort_dir))
+
+
+def check_followers_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = None):
+    sort_settings = check_relationships_sorting(sort, sort_dir)
+
+    # Followers are always returned in a stable order, so that pages can be continued with a cursor
+    return SortingRelationships(sort=RelationshipsSortingModel.created, sort_dir=SortingDir.desc) \
+        if sort_settings.sort is None else sort_settings
+
+
+def check_followers_cursor(
+        cursor: Optional[str] = None,
+        sort_settings: SortingRelationships = Depends(check_followers_sorting)
+) -> Optional[FollowersCursor]:
+    if cursor is None:
+        return None
+
+    try:
+        followers_cursor = FollowersCursor.decode(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor.'
+        )
+
+    if followers_cursor.sort_dir != sort_settings.sort_dir:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Cursor was issued for a different sorting method.'
+        )
+
+    return followers_cursor
@@ -0,0 +1,22 @@
+import argparse
+import logging
+
+from app.core.config import settings
+from app.db.followers import backfill
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Add the missing reverse edge of every relationship.')
+    parser.add_argument('--batch-size', type=int, default=settings.REBALANCE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logger.info("Backfilling reverse edges")
+    inserted = backfill(batch_size=args.batch_size)
+    logger.info(f"{inserted} reverse edges added")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import logging
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.horizontal_shard import ShardedQuery
+
+from app.db.models import Relationship
+from app.db.parallel import ParallelShardedQuery, ShardTimeout, shard_executor
+from app.db.session import SessionLocal, engines
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def delay_shards(delays: dict) -> None:
+    """
+    Make every SELECT of a shard wait on the server for its delay, so that it can also be cancelled there.
+    """
+    for shard_id, delay in delays.items():
+        def delay_select(conn, cursor, statement, parameters, context, executemany, delay=delay):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statement = f'SELECT pg_sleep({delay}); {statement}'
+            return statement, parameters
+
+        event.listen(engines[shard_id], 'before_cursor_execute', delay_select, retval=True)
+
+
+def benchmark(query_cls, repeat: int, followed_user_id: uuid.UUID):
+    """
+    Median milliseconds of a query reaching every shard, with the number of rows of the last run,
+    or None if the query timed out.
+    """
+    db = SessionLocal(query_cls=query_cls)
+    # Followed users aren't the shard key of relationships, so the query is sent to every shard
+    query = db.query(Relationship).filter(Relationship.followed_user_id == followed_user_id)
+    timings, rows = [], None
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                rows = len(query.all())
+            except ShardTimeout:
+                rows = None
+            timings.append((time.perf_counter() - start) * 1000)
+            db.rollback()
+    finally:
+        db.close()
+
+    return statistics.median(timings), rows
+
+
+def main() -> None:
+    """
+    Compare the latency of a query reaching every shard, run one shard after another and in parallel,
+    with every shard delayed by a different number of seconds, then with a timeout below the slowest delay.
+
+    Usage: python -m app.benchmark_shards [delay of each shard in seconds, comma separated] [repeat]
+    """
+    delays = [float(d) for d in sys.argv[1].split(',')] if len(sys.argv) > 1 else [0.05, 0.1, 0.2]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    delays = dict(zip(engines, delays + [delays[-1]] * (len(engines) - len(delays))))
+    with engines[next(iter(engines))].connect() as connection:
+        followed_user_id = connection.execute(select([Relationship.followed_user_id]).limit(1)).scalar() \
+            or uuid.uuid4()
+    delay_shards(delays)
+    logger.info(f"Delays: {', '.join(f'{shard_id} {delay * 1000:.0f} ms' for shard_id, delay in delays.items())}")
+
+    sequential, rows = benchmark(ShardedQuery, repeat, followed_user_id)
+    logger.info(f"Sequential: {sequential:.1f} ms, {rows} rows (sum of delays {sum(delays.values()) * 1000:.0f} ms)")
+
+    shard_executor.timeout = 0
+    parallel, rows = benchmark(ParallelShardedQuery, repeat, followed_user_id)
+    logger.info(f"Parallel: {parallel:.1f} ms, {rows} rows (slowest delay {max(delays.values()) * 1000:.0f} ms)")
+
+    shard_executor.timeout = (sorted(delays.values())[-2] + max(delays.values())) / 2 if len(delays) > 1 else 0
+    for partial_results in (False, True):
+        shard_executor.partial_results = partial_results
+        timed, rows = benchmark(ParallelShardedQuery, repeat, followed_user_id)
+        logger.info(f"Parallel, timeout {shard_executor.timeout * 1000:.0f} ms, partial results {partial_results}: "
+                    f"{timed:.1f} ms, " + ("ShardTimeout" if rows is None else f"{rows} rows"))
+
+    shard_executor.shutdown()
+    logger.info(f"Connections still checked out: {sum(engine.pool.checkedout() for engine in engines.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import logging
+import sys
+
+from app.core.config import settings
+from app.db.followers import check
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare relationships with their reverse edges.')
+    parser.add_argument('--repair', action='store_true',
+                        help='add missing reverse edges and remove orphaned ones')
+    parser.add_argument('--grace-seconds', type=float, default=60,
+                        help='skip rows younger than this, their write may still be in progress')
+    parser.add_argument('--batch-size', type=int, default=settings.REBALANCE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    report = check(batch_size=args.batch_size, grace_seconds=args.grace_seconds, repair=args.repair)
+    logger.info(', '.join(f'{key}: {value}' for key, value in report.items()))
+
+    # Exits non-zero on inconsistencies which were not repaired
+    if not args.repair and (report.get('missing') or report.get('orphaned')):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
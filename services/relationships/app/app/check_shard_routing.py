@@ -0,0 +1,52 @@
+import logging
+import sys
+import uuid
+
+from app import crud, schemas
+from app.db.routing import shard_routing
+from app.db.session import SessionLocal, shard_ids
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def check(db) -> bool:
+    """
+    Run every CRUD method reading the edges or the followers of a user and check that its queries contacted a single shard.
+    """
+    user_id, followed_user_id = uuid.uuid4(), uuid.uuid4()
+    sorting = dict(sort=schemas.RelationshipsSortingModel.created, sort_dir=schemas.SortingDir.desc)
+    calls = {
+        'get_following_by_user': lambda: crud.relationship.get_following_by_user(db, user_id=user_id, **sorting),
+        'get_relationship': lambda: crud.relationship.get_relationship(db, user_id=user_id,
+                                                                       followed_user_id=followed_user_id),
+        'count_following_by_user (exact)':
+            lambda: crud.relationship.count_following_by_user(db, user_id=user_id, mode=schemas.CountMode.exact),
+        'count_following_by_user (estimate)':
+            lambda: crud.relationship.count_following_by_user(db, user_id=user_id, mode=schemas.CountMode.estimate),
+        'get_user_followers': lambda: crud.relationship.get_user_followers(db, user_id=followed_user_id, **sorting),
+        'count_user_followers (exact)':
+            lambda: crud.relationship.count_user_followers(db, user_id=followed_user_id, mode=schemas.CountMode.exact),
+    }
+
+    passed = True
+    for name, call in calls.items():
+        with shard_routing.track() as trace:
+            call()
+
+        contacted = sorted({shard_id for shards in trace for shard_id in shards})
+        single = bool(trace) and all(len(shards) == 1 for shards in trace)
+        passed = passed and single
+        logger.info(f"{'OK' if single else 'FAILED'} {name}: {len(trace)} queries, shards {contacted}")
+
+    return passed
+
+
+def main() -> None:
+    logger.info(f"Checking shard routing across shards {', '.join(shard_ids)}")
+    if not check(SessionLocal()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Dict, List, Optional
+
 from pydantic import BaseSettings, AnyUrl
 
 
@@ -6,8 +8,27 @@ class Settings(BaseSettings):
     API_USERS: str
     SERVICE_NAME: str
 
-    DATABASE1_URL: AnyUrl
-    DATABASE2_URL: AnyUrl
+    # Shards of the relationships by shard id, e.g. {"db1": "postgresql+psycopg2://..."} as JSON.
+    # Defaults to DATABASE1_URL and DATABASE2_URL as shards db1 and db2
+    SHARDS: Dict[str, AnyUrl] = {}
+    DATABASE1_URL: Optional[AnyUrl] = None
+    DATABASE2_URL: Optional[AnyUrl] = None
+    # Points of every shard on the consistent-hash ring, changing it moves edges like changing SHARDS does
+    SHARD_VIRTUAL_NODES: int = 64
+    # Shards left out of the ring, so that `rebalance_shards` moves their edges away before they are removed
+    SHARDS_DRAINING: List[str] = []
+    # Set while `rebalance_shards` moves edges to the shards of a changed ring: an edge may still be on
+    # its old shard, so queries by user are sent to every shard
+    SHARDS_REBALANCING: bool = False
+    # Queries needing several shards are sent to all of them at once, on SHARD_THREADS threads per worker.
+    # A shard has SHARD_TIMEOUT seconds to answer (0 waits for ever), after which the query fails,
+    # or returns the rows of the other shards with SHARD_PARTIAL_RESULTS
+    SHARDS_PARALLEL: bool = False
+    SHARD_THREADS: int = 16
+    SHARD_TIMEOUT: float = 5
+    SHARD_PARTIAL_RESULTS: bool = False
+    # Edges read from a shard at once by `rebalance_shards`
+    REBALANCE_BATCH_SIZE: int = 1000
 
     USERS_SERVICE_NAME: str
 
@@ -15,8 +36,24 @@ class Settings(BaseSettings):
     POOL_MAX_OVERFLOW: int
     POOL_TIMEOUT: int
 
+    # Seconds for which total counts of list endpoints are cached with count=cached
+    COUNT_CACHE_TTL: int = 10
+
+    # Access tokens are verified locally with the public keys published by the users service,
+    # which are fetched again after JWKS_CACHE_TTL seconds. USERS_JWKS_URL defaults to the users service
+    USERS_JWKS_URL: Optional[str] = None
+    JWT_ALGORITHMS: List[str] = ["RS256", "ES256"]
+    JWKS_CACHE_TTL: int = 300
+
     class Config:
         case_sensitive = True
 
+    def shard_urls(self) -> Dict[str, AnyUrl]:
+        if self.SHARDS:
+            return self.SHARDS
+
+        return {shard_id: url for shard_id, url in (("db1", self.DATABASE1_URL), ("db2", self.DATABASE2_URL))
+                if url is not None}
+
 
 settings = Settings()
@@ -1,14 +1,24 @@
+import heapq
+import uuid
+from itertools import groupby, islice
 from operator import attrgetter
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.db.models import Relationship
-from app.schemas import RelationshipCreate, RelationshipUpdate, SortingDir, RelationshipsSortingModel
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from app.crud.total_count import TotalCounter, estimate_count
+from app.db.models import Relationship, Follower
+from app.db.session import query_chooser, route_query
+from app.schemas import RelationshipCreate, RelationshipUpdate, SortingDir, RelationshipsSortingModel, CountMode, \
+    FollowersCursor
+from sqlalchemy import func, inspect, tuple_
+from sqlalchemy.orm import Session, Query
 from datetime import datetime, timezone
 
+# Follower counts are exact by default, so that a follow or unfollow shows in them at once
+relationships_counter = TotalCounter(ttl=settings.COUNT_CACHE_TTL)
+
 
 def determine_relationships_sorting_type(sort: RelationshipsSortingModel, sort_dir: SortingDir):
     sorting_method = None
@@ -19,11 +29,30 @@ def determine_relationships_sorting_type(sort: RelationshipsSortingModel, sort_d
     return sorting_method
 
 
-def sort_relationships_manually(query_result, sort: RelationshipsSortingModel, sort_dir: SortingDir):
-    if sort == RelationshipsSortingModel.created:
-        query_result = sorted(query_result, key=attrgetter('created'), reverse=(sort_dir == SortingDir.desc))
+def determine_followers_keyset_sorting(sort_dir: SortingDir):
+    # Relationship id breaks ties between equal creation times, which keeps the order stable for cursors
+    if sort_dir == SortingDir.asc:
+        return [Follower.created.asc(), Follower.id.asc()]
+    else:
+        return [Follower.created.desc(), Follower.id.desc()]
+
 
-    return query_result
+def determine_followers_keyset_filter(cursor: FollowersCursor):
+    if cursor.sort_dir == SortingDir.asc:
+        return tuple_(Follower.created, Follower.id) > tuple_(cursor.created, cursor.id)
+    else:
+        return tuple_(Follower.created, Follower.id) < tuple_(cursor.created, cursor.id)
+
+
+def merge_shard_pages(rows: List, *, skip: int, limit: int, sort_dir: SortingDir) -> List:
+    """
+    Exact page of rows sorted by (created, id) across shards, from the first `skip + limit` rows
+    of every shard. The rows of a shard come one after another and in order, so a heap merge
+    of those runs yields the global order.
+    """
+    runs = [list(run) for _, run in groupby(rows, key=lambda row: inspect(row).identity_token)]
+    merged = heapq.merge(*runs, key=attrgetter('created', 'id'), reverse=(sort_dir == SortingDir.desc))
+    return list(islice(merged, skip, skip + limit))
 
 
 def calculate_total_counts(counts) -> int:
@@ -35,25 +64,80 @@ def calculate_total_counts(counts) -> int:
     return total_counts
 
 
+def count_relationships(db: Session, query: Query, *, mode: Optional[CountMode], key) -> Optional[int]:
+    return relationships_counter.count(
+        mode=mode,
+        key=key,
+        exact=lambda: calculate_total_counts(query.with_entities(func.count()).all()),
+        estimate=lambda: sum(estimate_count(db, query, shard_id=shard_id) for shard_id in query_chooser(query))
+    )
+
+
 class CRUDReview(CRUDBase[Relationship, RelationshipCreate, RelationshipUpdate]):
     def create(self, db: Session, *, obj_in: RelationshipCreate):
         db_obj = Relationship(
+            id=uuid.uuid4(),
             user_id=obj_in.user_id,
             followed_user_id=obj_in.followed_user_id,
             created=datetime.now(timezone.utc)
         )
+        # The edge and its reverse edge are committed by one flush, but on two shards without a two-phase
+        # commit: check_followers finds and repairs an edge whose reverse edge failed to commit
         db.add(db_obj)
+        db.add(Follower(id=db_obj.id, user_id=db_obj.user_id, followed_user_id=db_obj.followed_user_id,
+                        created=db_obj.created))
         db.commit()
+        relationships_counter.invalidate()
         db.refresh(db_obj)
         return db_obj
 
+    def remove(self, db: Session, *, id: UUID) -> Relationship:
+        obj = db.query(self.model).get(id)
+        if settings.SHARDS_REBALANCING:
+            return self.remove_moving(db, obj=obj)
+
+        follower = db.query(Follower).filter(Follower.followed_user_id == obj.followed_user_id,
+                                             Follower.id == id).first()
+        db.delete(obj)
+        if follower:
+            db.delete(follower)
+        db.commit()
+        relationships_counter.invalidate()
+        return obj
+
+    def remove_moving(self, db: Session, *, obj: Relationship) -> Relationship:
+        """
+        Delete an edge and its reverse edge by id on every shard, while the rebalancer may be moving them.
+
+        A moving row is locked on its source shard until the move has committed it on the target, so a delete
+        waiting for the lock matches no row. The deletes are then run a second time, which finds the row
+        on the target shard.
+        """
+        db.expunge(obj)
+        for _ in range(2):
+            db.query(Relationship).filter(Relationship.user_id == obj.user_id, Relationship.id == obj.id) \
+                .delete(synchronize_session=False)
+            db.query(Follower).filter(Follower.followed_user_id == obj.followed_user_id, Follower.id == obj.id) \
+                .delete(synchronize_session=False)
+        db.commit()
+        relationships_counter.invalidate()
+        return obj
+
     def get_user_followers(self, db: Session, *, skip: int = 0,
                            limit: int = 100, user_id: UUID,
-                           sort: RelationshipsSortingModel, sort_dir: SortingDir) -> List[Relationship]:
-        query_result = db.query(self.model).filter(Relationship.followed_user_id == user_id) \
-            .offset(skip).limit(limit).all()
+                           sort: RelationshipsSortingModel, sort_dir: SortingDir,
+                           cursor: Optional[FollowersCursor] = None) -> List[Follower]:
+        query = db.query(Follower).filter(Follower.followed_user_id == user_id) \
+            .order_by(*determine_followers_keyset_sorting(sort_dir))
+        if cursor:
+            query, skip = query.filter(determine_followers_keyset_filter(cursor)), 0
+
+        # Reverse edges of a user are on a single shard, which pages them,
+        # but all shards are read while SHARDS_REBALANCING is set
+        if len(route_query(query)) == 1:
+            return query.offset(skip).limit(limit).all()
 
-        return sort_relationships_manually(query_result, sort, sort_dir)
+        return merge_shard_pages(query.limit(skip + limit).all(), skip=skip, limit=limit, sort_dir=sort_dir)
 
     def get_following_by_user(self, db: Session, *, skip: int = 0,
                               limit: int = 100, user_id: UUID,
@@ -65,13 +149,15 @@ class CRUDReview(CRUDBase[Relationship, RelationshipCreate, RelationshipUpdate])
         return db.query(self.model).filter(Relationship.user_id == user_id,
                                            Relationship.followed_user_id == followed_user_id).first()
 
-    def count_following_by_user(self, db: Session, *, user_id: UUID):
-        counts = db.query(func.count(Relationship.id)).filter(Relationship.user_id == user_id).all()
-        return calculate_total_counts(counts)
+    def count_following_by_user(self, db: Session, *, user_id: UUID,
+                                mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(Relationship.id).filter(Relationship.user_id == user_id)
+        return count_relationships(db, query, mode=mode, key=('following', user_id))
 
-    def count_user_followers(self, db: Session, *, user_id: UUID) -> int:
-        counts = db.query(func.count(Relationship.id)).filter(Relationship.followed_user_id == user_id).all()
-        return calculate_total_counts(counts)
+    def count_user_followers(self, db: Session, *, user_id: UUID,
+                             mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(Follower.id).filter(Follower.followed_user_id == user_id)
+        return count_relationships(db, query, mode=mode, key=('followers', user_id))
 
 
 relationship = CRUDReview(Relationship)
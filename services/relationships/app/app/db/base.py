@@ -3,3 +3,4 @@
 
 from app.db.base_class import Base  # noqa
 from app.db.models.relationship import Relationship  # noqa
+from app.db.models.follower import Follower  # noqa
@@ -0,0 +1,115 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from sqlalchemy import select, Table
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import Relationship, Follower
+from app.db.rebalance import scan_shard
+from app.db.session import engines, shard_lookup
+
+logger = logging.getLogger(__name__)
+
+relationship_table = Relationship.__table__
+follower_table = Follower.__table__
+EDGE_COLUMNS = ['user_id', 'followed_user_id', 'created']
+
+
+def candidate_shards(key) -> List[str]:
+    # While rows are being moved, a row may still be on any shard
+    return list(engines) if settings.SHARDS_REBALANCING else [shard_lookup(key)]
+
+
+def existing_ids(table: Table, ids_by_shard: Dict[str, List]) -> Set:
+    found = set()
+    for shard_id, ids in ids_by_shard.items():
+        with engines[shard_id].connect() as connection:
+            found.update(id for id, in connection.execute(select([table.c.id]).where(table.c.id.in_(ids))))
+
+    return found
+
+
+def insert_followers(rows: List[Dict]) -> int:
+    inserted = 0
+    by_shard = defaultdict(list)
+    for row in rows:
+        by_shard[shard_lookup(row['followed_user_id'])].append(row)
+
+    for shard_id, shard_rows in by_shard.items():
+        with engines[shard_id].begin() as connection:
+            inserted += connection.execute(insert(follower_table).values(shard_rows)
+                                           .on_conflict_do_nothing(index_elements=['id'])).rowcount
+
+    return inserted
+
+
+def backfill(*, batch_size: int) -> int:
+    """
+    Add the missing reverse edge of every edge, returns the number of added reverse edges.
+    """
+    inserted = 0
+    for shard_id, engine in engines.items():
+        Base.metadata.create_all(engine)
+
+    for shard_id in engines:
+        columns = [relationship_table.c[column] for column in EDGE_COLUMNS]
+        for rows in scan_shard(shard_id, relationship_table, columns, batch_size=batch_size):
+            inserted += insert_followers([dict(row) for row in rows])
+
+        logger.info(f'Shard {shard_id}: {inserted} reverse edges added so far')
+
+    return inserted
+
+
+def check(*, batch_size: int, grace_seconds: float, repair: bool = False) -> Dict[str, int]:
+    """
+    Compare the edges with the reverse edges, shard by shard and batch by batch.
+
+    Counts the edges without a reverse edge (`missing`) and the reverse edges without an edge (`orphaned`).
+    Rows younger than `grace_seconds` are skipped, the other half of their write may not be committed yet.
+    With `repair` the missing reverse edges are added and the orphaned ones removed.
+    """
+    report = Counter(edges=0, reverse_edges=0, missing=0, orphaned=0, **(dict(added=0, removed=0) if repair else {}))
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+
+    for shard_id in engines:
+        columns = [relationship_table.c[column] for column in EDGE_COLUMNS]
+        for rows in scan_shard(shard_id, relationship_table, columns, batch_size=batch_size):
+            rows = [dict(row) for row in rows if row.created < cutoff]
+            report['edges'] += len(rows)
+
+            ids_by_shard = defaultdict(list)
+            for row in rows:
+                for target_id in candidate_shards(row['followed_user_id']):
+                    ids_by_shard[target_id].append(row['id'])
+
+            found = existing_ids(follower_table, ids_by_shard)
+            missing = [row for row in rows if row['id'] not in found]
+            report['missing'] += len(missing)
+            if repair and missing:
+                report['added'] += insert_followers(missing)
+
+    for shard_id in engines:
+        columns = [follower_table.c.user_id, follower_table.c.created]
+        for rows in scan_shard(shard_id, follower_table, columns, batch_size=batch_size):
+            rows = [row for row in rows if row.created < cutoff]
+            report['reverse_edges'] += len(rows)
+
+            ids_by_shard = defaultdict(list)
+            for row in rows:
+                for target_id in candidate_shards(row.user_id):
+                    ids_by_shard[target_id].append(row.id)
+
+            found = existing_ids(relationship_table, ids_by_shard)
+            orphaned = [row.id for row in rows if row.id not in found]
+            report['orphaned'] += len(orphaned)
+            if repair and orphaned:
+                with engines[shard_id].begin() as connection:
+                    report['removed'] += connection.execute(
+                        follower_table.delete().where(follower_table.c.id.in_(orphaned))).rowcount
+
+    return dict(report)
@@ -4,7 +4,7 @@ import urllib.request
 import urllib.parse
 
 from app.db.base_class import Base
-from app.db.session import db1, db2
+from app.db.session import engines
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
@@ -17,7 +17,7 @@ def generate_base_url(service_name: str, api_prefix: str) -> str:
 
 
 def init_db(db: Session) -> None:
-    for dbb in (db1, db2):
+    for dbb in engines.values():
         Base.metadata.drop_all(dbb)
         Base.metadata.create_all(dbb)
 
@@ -1 +1,2 @@
 from .relationship import Relationship
+from .follower import Follower
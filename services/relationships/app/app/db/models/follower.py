@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Index
+
+from app.db.base_class import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class Follower(Base):
+    """
+    Reverse edge of a `Relationship`, with the same id. It is sharded by followed_user_id,
+    so that the followers of a user are read from a single shard.
+    """
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    followed_user_id = Column(UUID(as_uuid=True), nullable=False)
+    created = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_follower_followed_user_id_created', 'followed_user_id', 'created'),
+    )
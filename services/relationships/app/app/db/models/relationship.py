@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, Index
 
 from app.db.base_class import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -10,3 +10,8 @@ class Relationship(Base):
     user_id = Column(UUID(as_uuid=True), nullable=False)
     followed_user_id = Column(UUID(as_uuid=True), nullable=False)
     created = Column(DateTime, nullable=False)
+
+    # Queries by user are routed to a single shard, where this index serves them
+    __table_args__ = (
+        Index('ix_relationship_user_id_created', 'user_id', 'created'),
+    )
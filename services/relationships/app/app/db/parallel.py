@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Optional
+
+from sqlalchemy.ext.horizontal_shard import ShardedQuery
+
+from app.core.config import settings
+from app.db.routing import shard_routing
+
+logger = logging.getLogger(__name__)
+
+
+class ShardTimeout(Exception):
+    """
+    Raised when a shard doesn't answer a query in parallel mode within `timeout` and partial results are off.
+    """
+
+    def __init__(self, shard_ids: List[str]):
+        super().__init__(f'Shards {", ".join(shard_ids)} did not answer in time')
+        self.shard_ids = shard_ids
+
+
+class ShardCall:
+    """
+    A statement running on one shard, on a connection of its own. The connection is published
+    before the statement runs, so that a timed out statement can be cancelled on the server.
+    """
+
+    def __init__(self, engine, statement, params):
+        self.engine = engine
+        self.statement = statement
+        self.params = params
+        self.connection = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        self.connection = self.engine.connect()
+        try:
+            return self.connection.execute(self.statement, self.params)
+        except BaseException:
+            self.close()
+            raise
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self.connection is not None and not self.connection.closed:
+                self.connection.connection.connection.cancel()
+
+    def close(self) -> None:
+        # Called by the thread of the statement or by the thread of the query, whichever is last
+        with self._lock:
+            connection, self.connection = self.connection, None
+        if connection is not None:
+            connection.close()
+
+
+class ShardExecutor:
+    def __init__(self, *, threads: int, timeout: float, partial_results: bool):
+        """
+        Runs the statement of a query needing several shards on all of them at once.
+
+        **Parameters**
+
+        * `threads`: Statements running at once, across the queries of the worker
+        * `timeout`: Seconds every shard has to answer, measured from the start of the query, 0 waits for ever
+        * `partial_results`: Return the rows of the shards which answered when others time out,
+          instead of raising `ShardTimeout`
+
+        The statements run on connections of their own rather than on the connections of the session,
+        so parallel mode is only used for reads. A timed out statement is cancelled on its shard.
+        The pool of threads is started on first use, so gunicorn workers don't share it.
+        """
+        self.threads = threads
+        self.timeout = timeout
+        self.partial_results = partial_results
+        self._pool = None
+
+    def execute(self, calls: dict) -> dict:
+        """
+        Results by shard id of the `ShardCall`s by shard id. Timed out shards are left out of the results
+        and removed from `calls`, the connections of the remaining calls are closed by `close`.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='shard')
+
+        futures = {shard_id: self._pool.submit(call) for shard_id, call in calls.items()}
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+
+        results, timed_out = {}, []
+        try:
+            for shard_id, future in futures.items():
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    results[shard_id] = future.result(timeout=remaining)
+                except TimeoutError:
+                    timed_out.append(shard_id)
+                    self._abandon(calls.pop(shard_id), future)
+        except BaseException:
+            for shard_id, future in futures.items():
+                if shard_id in calls and not future.done():
+                    self._abandon(calls.pop(shard_id), future)
+            self.close(calls)
+            raise
+
+        if timed_out:
+            shard_routing.record_timeouts(timed_out, partial=self.partial_results)
+            if not self.partial_results:
+                self.close(calls)
+                raise ShardTimeout(timed_out)
+            logger.warning(f'Partial results, shards {", ".join(timed_out)} did not answer in time')
+
+        return results
+
+    @staticmethod
+    def _abandon(call: ShardCall, future) -> None:
+        if not future.cancel():
+            call.cancel()
+        # The connection is closed by the thread of the statement, which may even finish before the cancel
+        # reaches the shard
+        future.add_done_callback(lambda f: call.close())
+
+    @staticmethod
+    def close(calls: dict) -> None:
+        for call in calls.values():
+            call.close()
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+shard_executor = ShardExecutor(threads=settings.SHARD_THREADS, timeout=settings.SHARD_TIMEOUT,
+                               partial_results=settings.SHARD_PARTIAL_RESULTS)
+
+
+class ParallelShardedQuery(ShardedQuery):
+    """
+    `ShardedQuery` sending the statement of a query to all of its shards at once, so that the query
+    takes as long as its slowest shard rather than the sum of them. Rows are then loaded shard by shard,
+    in the order of the shards. Queries reaching a single shard run as before.
+    """
+
+    executor: Optional[ShardExecutor] = shard_executor
+
+    def _execute_and_instances(self, context):
+        if context.identity_token is not None or self._shard_id is not None:
+            return super()._execute_and_instances(context)
+
+        shard_ids = self.query_chooser(self)
+        if len(shard_ids) == 1:
+            return super().set_shard(shard_ids[0])._execute_and_instances(context)
+
+        mapper = self._bind_mapper()
+        calls = {shard_id: ShardCall(self.session.get_bind(mapper, shard_id=shard_id), context.statement,
+                                     self._params)
+                 for shard_id in shard_ids}
+
+        results = self.executor.execute(calls)
+        try:
+            partial = []
+            for shard_id, result in results.items():
+                context.attributes["shard_id"] = context.identity_token = shard_id
+                partial.extend(self.instances(result, context))
+        finally:
+            self.executor.close(calls)
+
+        return iter(partial)
@@ -0,0 +1,90 @@
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import select, Table
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.base import Base
+from app.db.session import engines, shard_keys, shard_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def scan_shard(shard_id: str, table: Table, columns: List, *, batch_size: int) -> Iterator[List[Tuple]]:
+    """
+    `columns` of the rows of `table` on `shard_id` in batches, in the order of ids, the id first.
+    Every batch is read in its own short query, so that writes to the shard are never blocked for long.
+    """
+    last_id = None
+    while True:
+        stmt = select([table.c.id, *columns]).order_by(table.c.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(table.c.id > last_id)
+
+        with engines[shard_id].connect() as connection:
+            rows = connection.execute(stmt).fetchall()
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1][0]
+
+
+def move_rows(table: Table, source_id: str, target_id: str, ids: List) -> int:
+    """
+    Move the rows `ids` of `table` from shard `source_id` to `target_id`, returns the number of moved rows.
+
+    The rows are deleted on the source first, which locks them against concurrent changes, and are
+    committed on the target before the source commits. A failure in between leaves a row on both shards,
+    which a rerun resolves, rather than on none. An unfollow waiting for the lock deletes the row again
+    on the target, see `remove_moving` of the relationships CRUD.
+    """
+    with engines[source_id].begin() as source:
+        rows = source.execute(table.delete().where(table.c.id.in_(ids)).returning(*table.c)).fetchall()
+        if rows:
+            with engines[target_id].begin() as target:
+                target.execute(insert(table).on_conflict_do_nothing(index_elements=['id']),
+                               [dict(row) for row in rows])
+
+    return len(rows)
+
+
+def rebalance(*, batch_size: int, dry_run: bool = False) -> Dict[Tuple[str, str, str], int]:
+    """
+    Move every row of a sharded table which is not on the shard the ring assigns to its shard key,
+    table by table and shard by shard.
+
+    Returns the number of rows moved, or which would be moved with `dry_run`, by (table, source shard,
+    target shard). Reads and writes continue meanwhile, with SHARDS_REBALANCING set they find rows on
+    either shard.
+    """
+    moved = Counter()
+
+    for shard_id, engine in engines.items():
+        # A new shard starts without tables, which are created here rather than by init_db dropping every table
+        if not dry_run:
+            Base.metadata.create_all(engine)
+
+    for table, key in shard_keys.items():
+        for source_id, engine in engines.items():
+            if not engine.has_table(table.name):
+                continue
+
+            for rows in scan_shard(source_id, table, [key], batch_size=batch_size):
+                moving = defaultdict(list)
+                for id, key_value in rows:
+                    target_id = shard_lookup(key_value)
+                    if target_id != source_id:
+                        moving[target_id].append(id)
+
+                for target_id, ids in moving.items():
+                    moved[table.name, source_id, target_id] += \
+                        len(ids) if dry_run else move_rows(table, source_id, target_id, ids)
+
+            logger.info(f'Shard {source_id}, {table.name}: ' +
+                        (', '.join(f'{count} rows to {target_id}'
+                                   for (name, source, target_id), count in moved.items()
+                                   if name == table.name and source == source_id) or 'no rows to move'))
+
+    return dict(moved)
@@ -0,0 +1,42 @@
+import hashlib
+from bisect import bisect
+from functools import lru_cache
+from typing import Iterable, List
+from uuid import UUID
+
+
+def hash_point(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    def __init__(self, shard_ids: Iterable[str], *, virtual_nodes: int = 64):
+        """
+        Consistent-hash ring placing users on shards.
+
+        **Parameters**
+
+        * `shard_ids`: Ids of the shards, only their names matter and not their order
+        * `virtual_nodes`: Points of every shard on the ring, more points spread the users more evenly
+
+        A user belongs to the shard of the first point after the hash of its id. Adding a shard only moves
+        the users whose ids fall just before its points, that is about 1/N of all users, removing one moves
+        only its own users.
+        """
+        self.shard_ids = sorted(set(shard_ids))
+        if not self.shard_ids:
+            raise ValueError('A ring needs at least one shard')
+
+        points = sorted((hash_point(f'{shard_id}#{i}'.encode()), shard_id)
+                        for shard_id in self.shard_ids for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard_id for _, shard_id in points]
+
+        self.lookup = lru_cache(maxsize=65536)(self._lookup)
+
+    def _lookup(self, user_id: UUID) -> str:
+        i = bisect(self._hashes, hash_point(user_id.bytes))
+        return self._shards[i % len(self._shards)]
+
+    def lookup_all(self, user_ids: Iterable[UUID]) -> List[str]:
+        return list(dict.fromkeys(self.lookup(user_id) for user_id in user_ids))
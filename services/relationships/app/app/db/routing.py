@@ -0,0 +1,60 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+
+class ShardRouting:
+    """
+    Counts the shards every query of the session is sent to, by the number of contacted shards
+    and by shard, and the shards which timed out in parallel mode. `track` additionally lists
+    the shards of each query run by the current thread.
+    """
+
+    def __init__(self):
+        self._fan_out = Counter()
+        self._by_shard = Counter()
+        self._timeouts = Counter()
+        self._partial_results = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def record(self, shard_ids: List[str]) -> List[str]:
+        with self._lock:
+            self._fan_out[len(shard_ids)] += 1
+            self._by_shard.update(shard_ids)
+
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace.append(list(shard_ids))
+
+        return shard_ids
+
+    def record_timeouts(self, shard_ids: List[str], *, partial: bool) -> None:
+        with self._lock:
+            self._timeouts.update(shard_ids)
+            self._partial_results += partial
+
+    @contextmanager
+    def track(self) -> Iterator[List[List[str]]]:
+        self._local.trace = trace = []
+        try:
+            yield trace
+        finally:
+            self._local.trace = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = sum(self._fan_out.values())
+            return dict(
+                queries=queries,
+                single_shard_queries=self._fan_out[1],
+                shards_per_query=sum(n * count for n, count in self._fan_out.items()) / queries if queries else 0.0,
+                fan_out={str(n): count for n, count in sorted(self._fan_out.items())},
+                by_shard=dict(self._by_shard),
+                timeouts=dict(self._timeouts),
+                partial_results=self._partial_results,
+            )
+
+
+shard_routing = ShardRouting()
@@ -1,36 +1,43 @@
 import uuid
-import hashlib
 
 from sqlalchemy import create_engine
 from sqlalchemy.ext.horizontal_shard import ShardedSession
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
-from app.db.models import Relationship
-from app.db.base_class import Base
-from sqlalchemy.sql import visitors, operators
-
-db1 = create_engine(settings.DATABASE1_URL, pool_pre_ping=True, pool_size=settings.POOL_SIZE,
-                    max_overflow=settings.POOL_MAX_OVERFLOW, pool_timeout=settings.POOL_TIMEOUT)
-db2 = create_engine(settings.DATABASE2_URL, pool_pre_ping=True, pool_size=settings.POOL_SIZE,
-                    max_overflow=settings.POOL_MAX_OVERFLOW, pool_timeout=settings.POOL_TIMEOUT)
+from app.db.models import Relationship, Follower
+from app.db.parallel import ParallelShardedQuery
+from app.db.ring import HashRing
+from app.db.routing import shard_routing
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnClause, Grouping
+
+engines = {
+    shard_id: create_engine(url, pool_pre_ping=True, pool_size=settings.POOL_SIZE,
+                            max_overflow=settings.POOL_MAX_OVERFLOW, pool_timeout=settings.POOL_TIMEOUT)
+    for shard_id, url in settings.shard_urls().items()
+}
+shard_ids = list(engines)
+
+# Column every sharded table is placed on the ring by: edges by their user, reverse edges by the followed user
+shard_keys = {
+    Relationship.__table__: Relationship.__table__.c.user_id,
+    Follower.__table__: Follower.__table__.c.followed_user_id,
+}
+
+ring = HashRing([shard_id for shard_id in shard_ids if shard_id not in settings.SHARDS_DRAINING],
+               virtual_nodes=settings.SHARD_VIRTUAL_NODES)
 
 create_session = sessionmaker(class_=ShardedSession, autocommit=False, autoflush=False)
 
-create_session.configure(
-    shards={
-        "db1": db1,
-        "db2": db2
-    }
-)
+create_session.configure(shards=engines)
+if settings.SHARDS_PARALLEL:
+    create_session.configure(query_cls=ParallelShardedQuery)
 
 
 # Sharding by user_id
 def shard_lookup(user_id: uuid.UUID):
-    if user_id.int % 2 == 1:
-        return "db1"
-    else:
-        return "db2"
+    return ring.lookup(user_id)
 
 
 def shard_chooser(mapper, instance, clause=None):
@@ -39,8 +46,10 @@ def shard_chooser(mapper, instance, clause=None):
     """
     if isinstance(instance, Relationship):
         return shard_lookup(instance.user_id)
+    elif isinstance(instance, Follower):
+        return shard_lookup(instance.followed_user_id)
     else:
-        return "db1"
+        return shard_ids[0]
 
 
 def id_chooser(query, ident):
@@ -52,38 +61,63 @@ def id_chooser(query, ident):
 
     """
 
-    return ["db1", "db2"]
+    return shard_routing.record(shard_ids)
 
 
 def query_chooser(query):
+    return shard_routing.record(route_query(query))
+
+
+def route_query(query):
     """query chooser.
 
-    this also returns a list of shard ids, which can
-    just be all of them.  but here we'll search into the Query in order
-    to try to narrow down the list of shards to query.
+    Edges are sharded by user_id and reverse edges by followed_user_id,
+    so a query constraining that column to one value, or to a list of
+    values (IN), only needs the shards of those users. Any other query
+    is sent to every shard.
 
     """
-    ids = []
+    chosen = None
 
-    # we'll grab continent names as we find them
-    # and convert to shard ids
     for column, operator, value in _get_query_comparisons(query):
         # "shares_lineage()" returns True if both columns refer to the same
         # statement column, adjusting for any annotations present.
         # (an annotation is an internal clone of a Column object
         # and occur when using ORM-mapped attributes like
-        # "WeatherLocation.continent"). A simpler comparison, though less
-        # accurate, would be "column.key == 'continent'".
-        if column.shares_lineage(Relationship.__table__.c.id):
+        # "Relationship.user_id").  A query reads a single table, so any
+        # shard key found is the one of that table.
+        if any(column.shares_lineage(key) for key in shard_keys.values()):
             if operator == operators.eq:
-                ids.append(shard_lookup(value))
+                ids = {shard_lookup(_to_uuid(value))}
             elif operator == operators.in_op:
-                ids.extend(shard_lookup(v) for v in value)
+                ids = {shard_lookup(_to_uuid(v)) for v in value}
+            else:
+                continue
+
+            # Comparisons are ANDed together, so the rows are on the shards all of them allow
+            chosen = ids if chosen is None else chosen & ids
 
-    if len(ids) == 0:
-        return ["db1", "db2"]
+    if chosen is None or settings.SHARDS_REBALANCING:
+        return shard_ids
     else:
-        return ids
+        # No shard can match, one is queried so that the query still returns an empty result
+        return [shard_id for shard_id in shard_ids if shard_id in chosen] or shard_ids[:1]
+
+
+def _to_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _get_conjuncts(clause):
+    """Clauses which all have to hold for `clause` to hold,
+    descending into AND but not into OR or NOT.
+
+    """
+    if isinstance(clause, Grouping):
+        return _get_conjuncts(clause.element)
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        return [conjunct for c in clause.clauses for conjunct in _get_conjuncts(c)]
+    return [clause]
 
 
 def _get_query_comparisons(query):
@@ -94,68 +128,45 @@ def _get_query_comparisons(query):
     (column, operator, values).   "values" is a single value
     or tuple of values depending on the operator.
 
+    Only comparisons ANDed to the rest of the criterion are returned,
+    a comparison under OR or NOT doesn't restrict the rows.
+
     """
-    binds = {}
-    clauses = set()
     comparisons = []
 
-    def visit_bindparam(bind):
-        # visit a bind parameter.
-
+    def bind_value(bind):
         # check in _params for it first
         if bind.key in query._params:
-            value = query._params[bind.key]
+            return query._params[bind.key]
         elif bind.callable:
             # some ORM functions (lazy loading)
             # place the bind's value as a
             # callable for deferred evaluation.
-            value = bind.callable()
+            return bind.callable()
         else:
             # just use .value
-            value = bind.value
+            return bind.value
 
-        binds[bind] = value
+    if query._criterion is None:
+        return comparisons
 
-    def visit_column(column):
-        clauses.add(column)
+    for binary in _get_conjuncts(query._criterion):
+        if not isinstance(binary, BinaryExpression):
+            continue
+
+        left, right = binary.left, binary.right
+        if isinstance(left, BindParameter) and binary.operator == operators.eq:
+            left, right = right, left
+        if not isinstance(left, ColumnClause):
+            continue
 
-    def visit_binary(binary):
         # special handling for "col IN (params)"
-        if (
-                binary.left in clauses
-                and binary.operator == operators.in_op
-                and hasattr(binary.right, "clauses")
-        ):
-            comparisons.append(
-                (
-                    binary.left,
-                    binary.operator,
-                    tuple(binds[bind] for bind in binary.right.clauses),
-                )
-            )
-        elif binary.left in clauses and binary.right in binds:
-            comparisons.append(
-                (binary.left, binary.operator, binds[binary.right])
-            )
-
-        elif binary.left in binds and binary.right in clauses:
-            comparisons.append(
-                (binary.right, binary.operator, binds[binary.left])
-            )
-
-    # here we will traverse through the query's criterion, searching
-    # for SQL constructs.  We will place simple column comparisons
-    # into a list.
-    if query._criterion is not None:
-        visitors.traverse_depthfirst(
-            query._criterion,
-            {},
-            {
-                "bindparam": visit_bindparam,
-                "binary": visit_binary,
-                "column": visit_column,
-            },
-        )
+        if binary.operator == operators.in_op and isinstance(right, Grouping) and \
+                all(isinstance(bind, BindParameter) for bind in right.element.clauses):
+            comparisons.append((left, binary.operator, tuple(bind_value(bind) for bind in right.element.clauses)))
+        elif isinstance(right, BindParameter):
+            comparisons.append((left, binary.operator, bind_value(right)))
+
     return comparisons
 
 
@@ -1,10 +1,12 @@
 import os
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.api.api.api import api_router
+from app.db.parallel import shard_executor, ShardTimeout
 
 app = FastAPI(title=settings.SERVICE_NAME,
               openapi_url=f"{settings.API_RELATIONSHIPS}/openapi.json")
@@ -24,3 +26,14 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix=settings.API_RELATIONSHIPS)
+
+
+@app.exception_handler(ShardTimeout)
+def reject_shard_timeout(request: Request, exc: ShardTimeout):
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        content={"detail": f"Shards {', '.join(exc.shard_ids)} did not answer in time."})
+
+
+@app.on_event("shutdown")
+def shutdown_shard_executor():
+    shard_executor.shutdown()
@@ -0,0 +1,27 @@
+import argparse
+import logging
+
+from app.core.config import settings
+from app.db.rebalance import rebalance
+from app.db.session import engines
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Move relationships to the shards assigned by the hash ring.')
+    parser.add_argument('--dry-run', action='store_true', help='only report how many edges would move')
+    parser.add_argument('--batch-size', type=int, default=settings.REBALANCE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if not args.dry_run and not settings.SHARDS_REBALANCING:
+        logger.warning("SHARDS_REBALANCING is not set, the service may miss edges until they are moved")
+
+    logger.info(f"{'Counting' if args.dry_run else 'Moving'} rows across shards {', '.join(engines)}")
+    moved = rebalance(batch_size=args.batch_size, dry_run=args.dry_run)
+    logger.info(f"{sum(moved.values())} rows {'would be' if args.dry_run else 'were'} moved")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
 from .relationship import Relationship, RelationshipCreate, RelationshipUpdate, RelationshipsInfo, Info
 from .sorting import SortingDir
+from .count import CountMode
 from .sorting_relationships import SortingRelationships, RelationshipsSortingModel
+from .token import TokenPayload
+from .shards import ShardRoutingMetrics
+from .cursor import FollowersCursor
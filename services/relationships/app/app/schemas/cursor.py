@@ -0,0 +1,31 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.schemas import SortingDir
+
+
+class FollowersCursor(BaseModel):
+    """
+    Position right after the last follower of a page, opaque to the clients.
+
+    Holds the creation time of the relationship together with its id,
+    which breaks ties between relationships created at the same time.
+    """
+    sort_dir: SortingDir
+    created: datetime
+    id: UUID
+
+    @classmethod
+    def after(cls, follower, sort_dir: SortingDir) -> 'FollowersCursor':
+        return cls(sort_dir=sort_dir, created=follower.created, id=follower.id)
+
+    @classmethod
+    def decode(cls, token: str) -> 'FollowersCursor':
+        padding = '=' * (-len(token) % 4)
+        return cls.parse_raw(base64.urlsafe_b64decode(token + padding))
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.json().encode()).decode().rstrip('=')
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -7,7 +7,7 @@ from pydantic import BaseModel
 
 class Info(BaseModel):
     count: int
-    totalCount: int
+    totalCount: Optional[int]
 
 
 class RelationshipBase(BaseModel):
@@ -34,6 +34,7 @@ class Relationship(RelationshipBase):
 class RelationshipsInfo(BaseModel):
     relationships: List[Relationship]
     info: Info
+    next_cursor: Optional[str] = None
     
     class Config:
         orm_mode = True
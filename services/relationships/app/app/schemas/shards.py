@@ -0,0 +1,13 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class ShardRoutingMetrics(BaseModel):
+    queries: int
+    single_shard_queries: int
+    shards_per_query: float
+    fan_out: Dict[str, int]
+    by_shard: Dict[str, int]
+    timeouts: Dict[str, int]
+    partial_results: int
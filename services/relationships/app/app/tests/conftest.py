@@ -0,0 +1,14 @@
+import json
+import os
+
+# Settings are read when the app is imported. The shards are never connected to by the unit tests
+os.environ.setdefault('API_RELATIONSHIPS', '/api/relationships')
+os.environ.setdefault('API_USERS', '/api/users')
+os.environ.setdefault('SERVICE_NAME', 'relationships')
+os.environ.setdefault('USERS_SERVICE_NAME', 'users')
+os.environ.setdefault('POOL_SIZE', '1')
+os.environ.setdefault('POOL_MAX_OVERFLOW', '0')
+os.environ.setdefault('POOL_TIMEOUT', '1')
+os.environ.setdefault('SHARDS', json.dumps({
+    shard_id: f'postgresql+psycopg2://postgres@localhost/{shard_id}' for shard_id in ('db1', 'db2', 'db3')
+}))
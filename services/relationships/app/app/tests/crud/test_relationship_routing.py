@@ -0,0 +1,70 @@
+import uuid
+
+import pytest
+from sqlalchemy.ext.horizontal_shard import ShardedQuery
+
+from app import crud, schemas
+from app.core.config import settings
+from app.db.routing import shard_routing
+from app.db.session import SessionLocal, shard_ids
+
+USER_ID, FOLLOWED_USER_ID = uuid.uuid4(), uuid.uuid4()
+SORTING = dict(sort=schemas.RelationshipsSortingModel.created, sort_dir=schemas.SortingDir.desc)
+
+CALLS = {
+    'get_following_by_user': lambda db: crud.relationship.get_following_by_user(db, user_id=USER_ID, **SORTING),
+    'get_relationship': lambda db: crud.relationship.get_relationship(db, user_id=USER_ID,
+                                                                      followed_user_id=FOLLOWED_USER_ID),
+    'count_following_by_user (exact)':
+        lambda db: crud.relationship.count_following_by_user(db, user_id=USER_ID, mode=schemas.CountMode.exact),
+    'count_following_by_user (estimate)':
+        lambda db: crud.relationship.count_following_by_user(db, user_id=USER_ID, mode=schemas.CountMode.estimate),
+    'get_user_followers': lambda db: crud.relationship.get_user_followers(db, user_id=FOLLOWED_USER_ID, **SORTING),
+    'get_user_followers (cursor)': lambda db: crud.relationship.get_user_followers(
+        db, user_id=FOLLOWED_USER_ID, cursor=schemas.FollowersCursor(
+            sort_dir=schemas.SortingDir.desc, created='2021-01-01T00:00:00', id=uuid.uuid4()), **SORTING),
+    'count_user_followers (exact)':
+        lambda db: crud.relationship.count_user_followers(db, user_id=FOLLOWED_USER_ID, mode=schemas.CountMode.exact),
+    'count_user_followers (estimate)':
+        lambda db: crud.relationship.count_user_followers(db, user_id=FOLLOWED_USER_ID,
+                                                          mode=schemas.CountMode.estimate),
+}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """
+    A session whose queries record the shards they would be sent to, without querying any database.
+    """
+    def execute_nowhere(query, context):
+        if query._shard_id is None:
+            query.query_chooser(query)
+        return iter([])
+
+    monkeypatch.setattr(ShardedQuery, '_execute_and_instances', execute_nowhere)
+    # Above the exact threshold, so that the estimate is returned rather than replaced with a count
+    monkeypatch.setattr(crud.crud_relationship, 'estimate_count', lambda db, query, *, shard_id: 10 ** 6)
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize('name', CALLS)
+def test_crud_method_queries_single_shard(db, name):
+    with shard_routing.track() as trace:
+        CALLS[name](db)
+
+    assert trace
+    assert all(len(shards) == 1 for shards in trace), trace
+
+
+@pytest.mark.parametrize('name', CALLS)
+def test_crud_method_queries_every_shard_while_rebalancing(db, monkeypatch, name):
+    monkeypatch.setattr(settings, 'SHARDS_REBALANCING', True)
+
+    with shard_routing.track() as trace:
+        CALLS[name](db)
+
+    assert trace
+    assert all(shards == shard_ids for shards in trace), trace
@@ -0,0 +1,93 @@
+import uuid
+from typing import Dict
+
+import pytest
+from sqlalchemy import not_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Relationship, Follower
+from app.db.session import route_query, shard_ids, shard_lookup
+
+
+@pytest.fixture(scope='module')
+def users() -> Dict[str, uuid.UUID]:
+    """
+    A user placed on each shard of the ring, by shard id.
+    """
+    users = {}
+    i = 0
+    while len(users) < len(shard_ids):
+        user_id = uuid.uuid5(uuid.NAMESPACE_OID, str(i))
+        users.setdefault(shard_lookup(user_id), user_id)
+        i += 1
+
+    return users
+
+
+def query(model, *criteria):
+    # Queries are only built, never executed, so the session needs no database
+    return Session().query(model).filter(*criteria)
+
+
+def test_eq_routes_to_one_shard(users):
+    for shard_id, user_id in users.items():
+        assert route_query(query(Relationship, Relationship.user_id == user_id)) == [shard_id]
+
+
+def test_eq_accepts_bind_on_the_left(users):
+    assert route_query(query(Relationship, users['db2'] == Relationship.user_id)) == ['db2']
+
+
+def test_in_routes_to_listed_shards(users):
+    assert route_query(query(Relationship, Relationship.user_id.in_([users['db1'], users['db3']]))) == \
+        ['db1', 'db3']
+
+
+def test_and_of_keys_routes_to_intersection(users):
+    criteria = [Relationship.user_id.in_([users['db1'], users['db2']]),
+                Relationship.user_id.in_([users['db2'], users['db3']])]
+
+    assert route_query(query(Relationship, *criteria)) == ['db2']
+    assert route_query(query(Relationship, criteria[0]).filter(criteria[1])) == ['db2']
+
+
+def test_and_with_other_columns_keeps_key(users):
+    assert route_query(query(Relationship, Relationship.user_id == users['db3'],
+                             Relationship.followed_user_id == users['db1'])) == ['db3']
+
+
+def test_empty_intersection_routes_to_one_shard(users):
+    assert route_query(query(Relationship, Relationship.user_id == users['db1'],
+                             Relationship.user_id == users['db2'])) == shard_ids[:1]
+
+
+@pytest.mark.parametrize('criterion', [
+    lambda users: or_(Relationship.user_id == users['db1'], Relationship.user_id == users['db2']),
+    lambda users: or_(Relationship.user_id == users['db1'], Relationship.followed_user_id == users['db1']),
+    lambda users: not_(Relationship.user_id == users['db1']),
+    lambda users: Relationship.user_id != users['db1'],
+    lambda users: Relationship.followed_user_id == users['db1'],
+])
+def test_unrestricted_fans_out(users, criterion):
+    assert route_query(query(Relationship, criterion(users))) == shard_ids
+
+
+def test_no_criterion_fans_out():
+    assert route_query(query(Relationship)) == shard_ids
+
+
+def test_rebalancing_fans_out(users, monkeypatch):
+    monkeypatch.setattr(settings, 'SHARDS_REBALANCING', True)
+
+    assert route_query(query(Relationship, Relationship.user_id == users['db1'])) == shard_ids
+    assert route_query(query(Follower, Follower.followed_user_id == users['db1'])) == shard_ids
+
+
+def test_follower_routes_on_followed_user_id(users):
+    for shard_id, user_id in users.items():
+        assert route_query(query(Follower, Follower.followed_user_id == user_id)) == [shard_id]
+
+    assert route_query(query(Follower, Follower.followed_user_id.in_([users['db1'], users['db2']]))) == \
+        ['db1', 'db2']
+    assert route_query(query(Follower, Follower.user_id == users['db1'])) == shard_ids
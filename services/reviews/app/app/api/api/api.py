@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.api.api.endpoints import reviews
+from app.api.api.endpoints import reviews, feed
 
 api_router = APIRouter()
 api_router.include_router(reviews.router, tags=["reviews"])
+api_router.include_router(feed.router, tags=["feed"])
@@ -0,0 +1,73 @@
+from typing import List, Any, Optional
+from uuid import UUID
+
+from app import schemas, crud
+from app.api import deps
+from app.core.relationships import fetch_followed_user_ids
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy.orm import Session
+
+router = APIRouter()
+
+
+@router.get("/feed/{user_id}",
+            response_model=schemas.ReviewsInfo
+            )
+def read_feed(
+        user_id: UUID,
+        db: Session = Depends(deps.get_db),
+        limit: int = 100,
+        cursor: Optional[schemas.ReviewsCursor] = Depends(deps.check_feed_cursor),
+        count: Optional[schemas.CountMode] = None
+) -> Any:
+    """
+    Retrieve the newest reviews of users followed by user_id.
+    """
+    reviews = crud.feed.get_feed(db, user_id=user_id, limit=limit, cursor=cursor)
+
+    total_count = crud.feed.count(db, user_id=user_id, mode=count)
+    info = schemas.Info(count=len(reviews), totalCount=total_count)
+    next_cursor = None if len(reviews) < limit else \
+        schemas.ReviewsCursor.after(reviews[-1], schemas.ReviewsSortingModel.created, schemas.SortingDir.desc).encode()
+
+    return schemas.ReviewsInfo(reviews=reviews, info=info, next_cursor=next_cursor)
+
+
+@router.get("/feed/{user_id}/following", response_model=List[UUID])
+def read_feed_following(
+        user_id: UUID,
+        db: Session = Depends(deps.get_db)
+) -> Any:
+    return crud.feed.get_following(db, user_id=user_id)
+
+
+@router.put("/feed/{user_id}/following", response_model=List[UUID])
+def update_feed_following(
+        user_id: UUID,
+        db: Session = Depends(deps.get_db),
+        *,
+        followed_user_ids: List[UUID] = Body(...)
+) -> Any:
+    """
+    Replace the users whose reviews appear in the feed of user_id.
+    """
+    return crud.feed.set_following(db, user_id=user_id, followed_user_ids=followed_user_ids)
+
+
+@router.post("/feed/{user_id}/sync", response_model=List[UUID])
+def sync_feed_following(
+        user_id: UUID,
+        db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Replace the users whose reviews appear in the feed of user_id with the ones followed in relationships service.
+    """
+    try:
+        followed_user_ids = fetch_followed_user_ids(user_id)
+    except OSError:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail='Could not fetch followed users from relationships service.'
+        )
+
+    return crud.feed.set_following(db, user_id=user_id, followed_user_ids=followed_user_ids)
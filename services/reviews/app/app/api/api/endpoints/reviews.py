@@ -1,38 +1,122 @@
-from typing import List, Any, Optional
+import asyncio
+import csv
+import io
+import json
+from typing import List, Any, Optional, Dict, AsyncIterator
 from uuid import UUID
 
 from app import schemas, crud
 from app.api import deps
+from app.api.fast_json import FastJSONResponse, serialize_rows
+from app.core.config import settings
 from app.db import models
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.db.session import AsyncSessionLocal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi.responses import StreamingResponse
 from pydantic.schema import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+REVIEW_FIELDS = list(schemas.Review.__fields__)
+REVIEW_COLUMNS = [getattr(models.Review, field) for field in REVIEW_FIELDS]
+
+
+def build_rating_stats(ids: List[UUID], rows) -> Dict[UUID, schemas.RatingStats]:
+    stats = {id: schemas.RatingStats(avg=None, count=0) for id in ids}
+    for id, avg_rating, rating_count in rows:
+        stats[id] = schemas.RatingStats(avg=avg_rating, count=rating_count)
+
+    return stats
+
+
+def build_next_cursor(reviews: List[models.Review], limit: int,
+                      sort_settings: schemas.SortingReviews) -> Optional[str]:
+    if not reviews or len(reviews) < limit:
+        return None
+
+    return schemas.ReviewsCursor.after(reviews[-1], sort_settings.sort, sort_settings.sort_dir).encode()
+
+
+EMPTY_HISTOGRAM = [0] * 10
+
+EXPORT_COLUMNS = ['id', 'user_id', 'movie_id', 'rating', 'comment', 'created']
+EXPORT_MEDIA_TYPES = {schemas.ExportFormat.ndjson: 'application/x-ndjson', schemas.ExportFormat.csv: 'text/csv'}
+
+
+def serialize_export_batch(rows, export_format: schemas.ExportFormat) -> str:
+    values = [(str(row.id), str(row.user_id), str(row.movie_id), row.rating, row.comment, row.created.isoformat())
+              for row in rows]
+
+    if export_format == schemas.ExportFormat.ndjson:
+        return ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, value))) + '\n' for value in values)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(values)
+    return buffer.getvalue()
+
 
 @router.get("/reviews",
             response_model=schemas.ReviewsInfo
             )
-def read_all_reviews(
-        db: Session = Depends(deps.get_db),
+async def read_all_reviews(
+        db: AsyncSession = Depends(deps.get_async_db),
+        count_db: AsyncSession = Depends(deps.get_async_db, use_cache=False),
         *,
         skip: int = 0,
         limit: int = 100,
         sort_settings: schemas.SortingReviews = Depends(deps.check_reviews_sorting),
+        cursor: Optional[schemas.ReviewsCursor] = Depends(deps.check_reviews_cursor),
         created_gte: Optional[datetime] = None,
-        user_id: Optional[List[UUID]] = Query(None)
+        user_id: Optional[List[UUID]] = Query(None),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
-    reviews = crud.review.get_multi_sort(db=db, skip=skip, limit=limit,
+    reviews, total_count = await asyncio.gather(
+        crud.async_review.get_multi_sort(db=db, skip=skip, limit=limit,
                                          sort=sort_settings.sort, sort_dir=sort_settings.sort_dir,
-                                         created_gte=created_gte, user_id=user_id)
-
-    total_count = crud.review.count_all(db=db, created_gte=created_gte, user_id=user_id)
+                                         created_gte=created_gte, user_id=user_id, cursor=cursor,
+                                         columns=REVIEW_COLUMNS if settings.FAST_RESPONSES else None),
+        crud.async_review.count_all(db=count_db, created_gte=created_gte, user_id=user_id, mode=count)
+    )
     info = schemas.Info(count=len(reviews), totalCount=total_count)
+    next_cursor = build_next_cursor(reviews, limit, sort_settings)
+
+    if settings.FAST_RESPONSES:
+        return FastJSONResponse(dict(reviews=serialize_rows(reviews, REVIEW_FIELDS), info=info.dict(),
+                                   next_cursor=next_cursor))
 
-    return schemas.ReviewsInfo(reviews=reviews, info=info)
+    return schemas.ReviewsInfo(reviews=reviews, info=info, next_cursor=next_cursor)
 
 
+@router.get("/reviews/export", response_class=StreamingResponse)
+async def export_reviews(
+        *,
+        export_format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson, alias='format'),
+        created_gte: Optional[datetime] = None,
+        user_id: Optional[List[UUID]] = Query(None),
+        movie_id: Optional[List[UUID]] = Query(None)
+) -> Any:
+    """
+    Stream all reviews matching the filters, oldest first, as NDJSON or CSV.
+    """
+    async def export() -> AsyncIterator[str]:
+        # The session lives as long as the response body is being sent
+        async with AsyncSessionLocal() as db:
+            if export_format == schemas.ExportFormat.csv:
+                yield ','.join(EXPORT_COLUMNS) + '\r\n'
+
+            async for rows in crud.async_review.stream_multi(db, created_gte=created_gte, user_id=user_id,
+                                                             movie_id=movie_id,
+                                                             batch_size=settings.REVIEWS_EXPORT_BATCH_SIZE):
+                yield serialize_export_batch(rows, export_format)
+
+    return StreamingResponse(export(), media_type=EXPORT_MEDIA_TYPES[export_format], headers={
+        'Content-Disposition': f'attachment; filename="reviews.{export_format.value}"'
+    })
+
+
+# Stays synchronous: the leaderboards are guarded by a thread lock, which must not be held across an await
 @router.get("/movies", response_model=List[UUID])
 def read_movies(
         db: Session = Depends(deps.get_db),
@@ -44,121 +128,215 @@ def read_movies(
     movies = crud.review.get_movies_sort(db=db, skip=skip, limit=limit,
                                          sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
 
-    return [movie_id for movie_id_list in movies for movie_id in movie_id_list]
+    return movies
 
 
 @router.get("/movie/{movie_id}/avg", response_model=Optional[float])
-def read_avg_by_movie(
-        db: Session = Depends(deps.get_db),
+async def read_avg_by_movie(
+        db: AsyncSession = Depends(deps.get_async_db),
         *,
         movie_id: UUID
 ) -> Any:
-    avg_rating = crud.review.get_average_by_movie(db=db, movie_id=movie_id)
+    avg_rating = await crud.async_review.get_average_by_movie(db=db, movie_id=movie_id)
 
-    return avg_rating[0]
+    return avg_rating
 
 
 @router.get("/movie/{movie_id}/count", response_model=Optional[int])
-def read_count_by_movie(
-        db: Session = Depends(deps.get_db),
+async def read_count_by_movie(
+        db: AsyncSession = Depends(deps.get_async_db),
         *,
         movie_id: UUID
 ) -> Any:
-    rating_count = crud.review.get_count_by_movie(db=db, movie_id=movie_id)
+    rating_count = await crud.async_review.get_count_by_movie(db=db, movie_id=movie_id)
 
-    return rating_count[0]
+    return rating_count
+
+
+@router.get("/movie/{movie_id}/histogram", response_model=schemas.RatingHistogram)
+async def read_histogram_by_movie(
+        db: AsyncSession = Depends(deps.get_async_db),
+        *,
+        movie_id: UUID,
+        percentile: List[float] = Depends(deps.check_percentiles)
+) -> Any:
+    """
+    Retrieve the number of reviews with every rating from 1 to 10, with the median and `percentile`s of ratings.
+    """
+    histogram = await crud.async_review.get_histogram_by_movie(db=db, movie_id=movie_id)
+
+    return schemas.RatingHistogram.from_histogram(histogram or EMPTY_HISTOGRAM, percentile)
+
+
+@router.post("/movies/histogram", response_model=Dict[UUID, schemas.RatingHistogram])
+async def read_histograms_by_movies(
+        db: AsyncSession = Depends(deps.get_async_db),
+        *,
+        movie_ids: List[UUID] = Body(...),
+        percentile: List[float] = Depends(deps.check_percentiles)
+) -> Any:
+    """
+    Retrieve rating histograms of many movies at once.
+    """
+    histograms = {movie_id: EMPTY_HISTOGRAM for movie_id in movie_ids}
+    histograms.update(await crud.async_review.get_histograms_by_movies(db=db, movie_ids=movie_ids))
+
+    return {movie_id: schemas.RatingHistogram.from_histogram(histogram, percentile)
+            for movie_id, histogram in histograms.items()}
 
 
 @router.get("/user/{user_id}/avg", response_model=Optional[float])
-def read_avg_by_user(
-        db: Session = Depends(deps.get_db),
+async def read_avg_by_user(
+        db: AsyncSession = Depends(deps.get_async_db),
         *,
         user_id: UUID
 ) -> Any:
-    avg_rating = crud.review.get_average_by_user(db=db, user_id=user_id)
+    avg_rating = await crud.async_review.get_average_by_user(db=db, user_id=user_id)
 
-    return avg_rating[0]
+    return avg_rating
 
 
 @router.get("/user/{user_id}/count", response_model=Optional[int])
-def read_count_by_user(
-        db: Session = Depends(deps.get_db),
+async def read_count_by_user(
+        db: AsyncSession = Depends(deps.get_async_db),
         *,
         user_id: UUID
 ) -> Any:
-    rating_count = crud.review.get_count_by_user(db=db, user_id=user_id)
+    rating_count = await crud.async_review.get_count_by_user(db=db, user_id=user_id)
+
+    return rating_count
+
+
+@router.post("/movies/stats", response_model=Dict[UUID, schemas.RatingStats])
+async def read_stats_by_movies(
+        db: AsyncSession = Depends(deps.get_async_db),
+        *,
+        movie_ids: List[UUID] = Body(...)
+) -> Any:
+    """
+    Retrieve average rating and rating count of many movies at once.
+    """
+    rows = await crud.async_review.get_stats_by_movies(db=db, movie_ids=movie_ids)
+
+    return build_rating_stats(movie_ids, rows)
+
+
+@router.post("/users/stats", response_model=Dict[UUID, schemas.RatingStats])
+async def read_stats_by_users(
+        db: AsyncSession = Depends(deps.get_async_db),
+        *,
+        user_ids: List[UUID] = Body(...)
+) -> Any:
+    """
+    Retrieve average rating and rating count of many users at once.
+    """
+    rows = await crud.async_review.get_stats_by_users(db=db, user_ids=user_ids)
 
-    return rating_count[0]
+    return build_rating_stats(user_ids, rows)
 
 
 @router.get("/movie/{movie_id}/reviews",
             response_model=schemas.ReviewsInfo
             )
-def read_movie_reviews(
+async def read_movie_reviews(
         movie_id: UUID,
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_async_db),
+        count_db: AsyncSession = Depends(deps.get_async_db, use_cache=False),
         skip: int = 0,
         limit: int = 100,
-        sort_settings: schemas.ReviewsSortingModel = Depends(deps.check_reviews_sorting)
+        sort_settings: schemas.SortingReviews = Depends(deps.check_reviews_sorting),
+        cursor: Optional[schemas.ReviewsCursor] = Depends(deps.check_reviews_cursor),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve reviews by movie.
     """
-    reviews = crud.review.get_by_movie(db, movie_id=movie_id, skip=skip, limit=limit,
-                                       sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
-
-    total_count = crud.review.get_count_by_movie(db=db, movie_id=movie_id)[0]
+    reviews, total_count = await asyncio.gather(
+        crud.async_review.get_by_movie(db, movie_id=movie_id, skip=skip, limit=limit,
+                                       sort=sort_settings.sort, sort_dir=sort_settings.sort_dir, cursor=cursor),
+        crud.async_review.count_by_movie(db=count_db, movie_id=movie_id, mode=count)
+    )
     info = schemas.Info(count=len(reviews), totalCount=total_count)
+    next_cursor = build_next_cursor(reviews, limit, sort_settings)
 
-    return schemas.ReviewsInfo(reviews=reviews, info=info)
+    return schemas.ReviewsInfo(reviews=reviews, info=info, next_cursor=next_cursor)
 
 
 @router.get("/user/{user_id}/reviews",
             response_model=schemas.ReviewsInfo
             )
-def read_user_reviews(
+async def read_user_reviews(
         user_id: UUID,
-        db: Session = Depends(deps.get_db),
+        db: AsyncSession = Depends(deps.get_async_db),
+        count_db: AsyncSession = Depends(deps.get_async_db, use_cache=False),
         skip: int = 0,
         limit: int = 100,
-        sort_settings: schemas.ReviewsSortingModel = Depends(deps.check_reviews_sorting)
+        sort_settings: schemas.SortingReviews = Depends(deps.check_reviews_sorting),
+        cursor: Optional[schemas.ReviewsCursor] = Depends(deps.check_reviews_cursor),
+        count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve reviews by movie.
     """
-    reviews = crud.review.get_by_user(db, user_id=user_id, skip=skip, limit=limit,
-                                      sort=sort_settings.sort, sort_dir=sort_settings.sort_dir)
-
-    total_count = crud.review.get_count_by_user(db=db, user_id=user_id)[0]
+    reviews, total_count = await asyncio.gather(
+        crud.async_review.get_by_user(db, user_id=user_id, skip=skip, limit=limit,
+                                      sort=sort_settings.sort, sort_dir=sort_settings.sort_dir, cursor=cursor),
+        crud.async_review.count_by_user(db=count_db, user_id=user_id, mode=count)
+    )
     info = schemas.Info(count=len(reviews), totalCount=total_count)
+    next_cursor = build_next_cursor(reviews, limit, sort_settings)
 
-    return schemas.ReviewsInfo(reviews=reviews, info=info)
+    return schemas.ReviewsInfo(reviews=reviews, info=info, next_cursor=next_cursor)
 
 
 @router.post("/new", response_model=schemas.Review)
-def add_review(
-        db: Session = Depends(deps.get_db),
+async def add_review(
+        db: AsyncSession = Depends(deps.get_async_db),
         *,
         review_in: schemas.ReviewCreate
 ) -> Any:
-    review = crud.review.get_by_user_and_movie(db=db, user_id=review_in.user_id, movie_id=review_in.movie_id)
+    review = await crud.async_review.create(db=db, obj_in=review_in)
 
-    if review:
+    if not review:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='You already reviewed this movie.'
         )
 
-    review = crud.review.create(db=db, obj_in=review_in)
     return review
 
 
+@router.post("/bulk", response_model=schemas.ReviewsBulkInfo)
+async def add_reviews(
+        db: AsyncSession = Depends(deps.get_async_db),
+        *,
+        reviews_in: List[schemas.ReviewCreate]
+) -> Any:
+    """
+    Create many reviews at once. Results are returned in the order of `reviews_in`,
+    reviews of movies the user has already reviewed are skipped.
+    """
+    if len(reviews_in) > settings.REVIEWS_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'At most {settings.REVIEWS_BULK_MAX_SIZE} reviews can be added at once.'
+        )
+
+    reviews = await crud.async_review.create_multi(db=db, objs_in=reviews_in)
+    results = [schemas.ReviewBulkResult(status=schemas.ReviewBulkStatus.created, review=review) if review
+               else schemas.ReviewBulkResult(status=schemas.ReviewBulkStatus.already_reviewed)
+               for review in reviews]
+    created = sum(1 for review in reviews if review)
+
+    return schemas.ReviewsBulkInfo(results=results, created=created, already_reviewed=len(reviews) - created)
+
+
 @router.delete("/review/{review_id}/delete", response_model=schemas.Review)
-def delete_review(
+async def delete_review(
         review_id: UUID,
-        db: Session = Depends(deps.get_db)
+        db: AsyncSession = Depends(deps.get_async_db)
 ) -> Any:
-    review = crud.review.get(db=db, id=review_id)
+    review = await crud.async_review.get(db=db, id=review_id)
 
     if not review:
         raise HTTPException(
@@ -166,17 +344,17 @@ def delete_review(
             detail='Review already deleted.'
         )
 
-    review = crud.review.remove(db=db, id=review_id)
+    review = await crud.async_review.remove(db=db, id=review_id)
 
     return review
 
 
 @router.get("/review/{review_id}", response_model=schemas.Review)
-def read_review(
+async def read_review(
         review_id: UUID,
-        db: Session = Depends(deps.get_db)
+        db: AsyncSession = Depends(deps.get_async_db)
 ) -> Any:
-    review = crud.review.get(db=db, id=review_id)
+    review = await crud.async_review.get(db=db, id=review_id)
 
     if not review:
         raise HTTPException(
@@ -188,12 +366,12 @@ def read_review(
 
 
 @router.get("/movie/{movie_id}/user/{user_id}", response_model=schemas.Review)
-def read_review_by_user_and_movie(
+async def read_review_by_user_and_movie(
         movie_id: UUID,
         user_id: UUID,
-        db: Session = Depends(deps.get_db)
+        db: AsyncSession = Depends(deps.get_async_db)
 ) -> Any:
-    review = crud.review.get_by_user_and_movie(db=db, user_id=user_id, movie_id=movie_id)
+    review = await crud.async_review.get_by_user_and_movie(db=db, user_id=user_id, movie_id=movie_id)
 
     if not review:
         raise HTTPException(
@@ -1,9 +1,19 @@
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, List, Optional
 
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError
+from pydantic import ValidationError
 
-from app.schemas import SortingDir, ReviewsSortingModel, SortingReviews, MoviesSortingModel, SortingMovies
-from app.db.session import SessionLocal
+from app.core.auth import jwks_verifier
+from app.core.config import settings
+from app.schemas import SortingDir, ReviewsSortingModel, SortingReviews, MoviesSortingModel, SortingMovies, \
+    ReviewsCursor, TokenPayload
+from app.db.session import SessionLocal, AsyncSessionLocal
+
+reusable_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_USERS}/login/access-token"
+)
 
 
 def get_db() -> Generator:
@@ -14,6 +24,22 @@ def get_db() -> Generator:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_token_payload(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+    # Verified with the cached public keys of the users service, without a request to it
+    try:
+        return TokenPayload(**jwks_verifier.decode(token))
+    except (JWTError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+
 def check_reviews_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = None):
     try:
         if sort:
@@ -27,10 +53,39 @@ def check_reviews_sorting(sort: Optional[str] = None, sort_dir: Optional[str] =
                    f' sort_dir: {[e.value for e in SortingDir]}.'
         )
 
-    return SortingReviews(sort=None, sort_dir=None) if sort is None else\
+    # Reviews are always returned in a stable order, so that pages can be continued with a cursor
+    return SortingReviews(sort=ReviewsSortingModel.created, sort_dir=SortingDir.desc) if sort is None else\
         SortingReviews(sort=ReviewsSortingModel(sort), sort_dir=SortingDir(sort_dir))
 
 
+def decode_reviews_cursor(cursor: str, sort_settings: SortingReviews) -> ReviewsCursor:
+    try:
+        reviews_cursor = ReviewsCursor.decode(cursor)
+    except ValueError:
+        reviews_cursor = None
+
+    if reviews_cursor is None or getattr(reviews_cursor, reviews_cursor.sort.value) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor.'
+        )
+
+    if reviews_cursor.sort != sort_settings.sort or reviews_cursor.sort_dir != sort_settings.sort_dir:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Cursor was issued for a different sorting method.'
+        )
+
+    return reviews_cursor
+
+
+def check_reviews_cursor(
+        cursor: Optional[str] = None,
+        sort_settings: SortingReviews = Depends(check_reviews_sorting)
+) -> Optional[ReviewsCursor]:
+    return None if cursor is None else decode_reviews_cursor(cursor, sort_settings)
+
+
 def check_movies_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = None):
     try:
         if sort:
@@ -46,3 +101,20 @@ def check_movies_sorting(sort: Optional[str] = None, sort_dir: Optional[str] = N
 
     return SortingMovies(sort=None, sort_dir=None) if sort is None else\
         SortingMovies(sort=MoviesSortingModel(sort), sort_dir=SortingDir(sort_dir))
+
+
+def check_feed_cursor(cursor: Optional[str] = None) -> Optional[ReviewsCursor]:
+    # Feeds are always ordered from the newest review
+    feed_sorting = SortingReviews(sort=ReviewsSortingModel.created, sort_dir=SortingDir.desc)
+
+    return None if cursor is None else decode_reviews_cursor(cursor, feed_sorting)
+
+
+def check_percentiles(percentile: List[float] = Query([25, 50, 75, 90])) -> List[float]:
+    if any(p < 0 or p > 100 for p in percentile):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Percentiles must be between 0 and 100.'
+        )
+
+    return percentile
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import crud, schemas
+from app.crud.crud_review import reviews_counter
+from app.db.session import SessionLocal, AsyncSessionLocal, async_engine
+from app.db import base  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Size of Starlette's threadpool, which runs the synchronous endpoints
+SYNC_THREADS = 40
+
+SORT = schemas.ReviewsSortingModel.created
+SORT_DIR = schemas.SortingDir.desc
+
+
+def list_reviews_sync() -> None:
+    db = SessionLocal()
+    try:
+        crud.review.get_multi_sort(db, sort=SORT, sort_dir=SORT_DIR, created_gte=None, user_id=None)
+        crud.review.count_all(db, created_gte=None, user_id=None, mode=schemas.CountMode.exact)
+    finally:
+        db.close()
+
+
+async def list_reviews_async() -> None:
+    async with AsyncSessionLocal() as db, AsyncSessionLocal() as count_db:
+        await asyncio.gather(
+            crud.async_review.get_multi_sort(db, sort=SORT, sort_dir=SORT_DIR, created_gte=None, user_id=None),
+            crud.async_review.count_all(count_db, created_gte=None, user_id=None, mode=schemas.CountMode.exact)
+        )
+
+
+def benchmark_sync(requests: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SYNC_THREADS) as executor:
+        for _ in executor.map(lambda _: list_reviews_sync(), range(requests)):
+            pass
+
+    return requests / (time.perf_counter() - start)
+
+
+async def benchmark_async(requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request() -> None:
+        async with semaphore:
+            await list_reviews_async()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    await async_engine.dispose()
+    return requests / elapsed
+
+
+def main() -> None:
+    """
+    Compare throughput of `GET /reviews` (a page and its exact count) on the psycopg2 and asyncpg data paths.
+
+    Usage: python -m app.benchmark_async [requests] [concurrency]
+    """
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    # Cached counts would hide the cost of the count query
+    reviews_counter.ttl = 0
+
+    logger.info(f"Sync: {benchmark_sync(requests):.1f} requests/s ({SYNC_THREADS} threads)")
+    logger.info(f"Async: {asyncio.run(benchmark_async(requests, concurrency)):.1f} requests/s"
+                f" ({concurrency} concurrent requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from jose import jwt, JWTError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the keys of the users service
+FETCH_TIMEOUT = 5
+
+
+def generate_jwks_url() -> str:
+    return settings.USERS_JWKS_URL or \
+        f"http://{settings.USERS_SERVICE_NAME}:80{settings.API_USERS}/.well-known/jwks.json"
+
+
+class JWKSVerifier:
+    def __init__(self, *, url: str, algorithms: List[str], ttl: float, refresh_interval: float = 10):
+        """
+        Verifies access tokens of the users service locally, with the public keys it publishes as a JWKS.
+
+        **Parameters**
+
+        * `url`: JWKS of the users service
+        * `algorithms`: Accepted signing algorithms
+        * `ttl`: Seconds for which the fetched keys are used before they are fetched again
+        * `refresh_interval`: Minimal number of seconds between two fetches
+
+        A token signed with an unknown key fetches the keys again, so a rotation is picked up
+        before `ttl` runs out, and `refresh_interval` keeps forged key ids from flooding the users
+        service. If a fetch fails, the keys fetched before are kept. A single thread fetches,
+        the others keep verifying with the keys fetched before meanwhile.
+        """
+        self.url = url
+        self.algorithms = algorithms
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+
+        self._keys = {}
+        self._fetched = None
+        self._refreshing = False
+        self._fetched_once = threading.Event()
+        self._lock = threading.Lock()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        key = self.key(jwt.get_unverified_header(token).get('kid'))
+        if key is None:
+            raise JWTError('Unknown signing key')
+
+        return jwt.decode(token, key, algorithms=self.algorithms)
+
+    def key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            refresh = not self._refreshing and (
+                self._fetched is None or self._fetched + self.ttl <= now or
+                (kid not in self._keys and self._fetched + self.refresh_interval <= now))
+            if refresh:
+                self._refreshing = True
+
+        if refresh:
+            self._refresh(now)
+        elif not self._fetched_once.is_set():
+            # There are no keys to fall back to before the first fetch, which another thread runs
+            self._fetched_once.wait(FETCH_TIMEOUT)
+
+        return self._keys.get(kid)
+
+    def _refresh(self, now: float) -> None:
+        # Fetched without holding the lock, so that a slow users service doesn't block the other requests
+        keys = None
+        try:
+            with urllib.request.urlopen(self.url, timeout=FETCH_TIMEOUT) as resp:
+                jwks = json.loads(resp.read().decode('utf-8'))
+            keys = {key['kid']: key for key in jwks['keys'] if key.get('alg') in self.algorithms}
+        except (OSError, ValueError, KeyError):
+            logger.exception(f'Could not fetch the signing keys from {self.url}')
+        finally:
+            with self._lock:
+                if keys is not None:
+                    self._keys = keys
+                self._fetched = now
+                self._refreshing = False
+            self._fetched_once.set()
+
+
+jwks_verifier = JWKSVerifier(url=generate_jwks_url(), algorithms=settings.JWT_ALGORITHMS, ttl=settings.JWKS_CACHE_TTL)
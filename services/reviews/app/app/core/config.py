@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseSettings, AnyUrl
 
 
@@ -5,17 +7,43 @@ class Settings(BaseSettings):
     API_MOVIES: str
     API_USERS: str
     API_REVIEWS: str
+    API_RELATIONSHIPS: str
     SERVICE_NAME: str
 
     DATABASE_URL: AnyUrl
 
     MOVIES_SERVICE_NAME: str
     USERS_SERVICE_NAME: str
+    RELATIONSHIPS_SERVICE_NAME: str
 
     POOL_SIZE: int
     POOL_MAX_OVERFLOW: int
     POOL_TIMEOUT: int
 
+    # Seconds for which total counts of list endpoints are cached with count=cached
+    COUNT_CACHE_TTL: int = 10
+
+    # Access tokens are verified locally with the public keys published by the users service,
+    # which are fetched again after JWKS_CACHE_TTL seconds. USERS_JWKS_URL defaults to the users service
+    USERS_JWKS_URL: Optional[str] = None
+    JWT_ALGORITHMS: List[str] = ["RS256", "ES256"]
+    JWKS_CACHE_TTL: int = 300
+
+    # Maximal number of reviews accepted by a single bulk request
+    REVIEWS_BULK_MAX_SIZE: int = 10000
+
+    # Rows fetched from the server-side cursor at once by the reviews export
+    REVIEWS_EXPORT_BATCH_SIZE: int = 1000
+
+    # Serve list endpoints from plain rows encoded by orjson, skipping the validation against `response_model`
+    FAST_RESPONSES: bool = False
+
+    # Movie leaderboards: seconds between incremental and full refreshes,
+    # and the number of average votes added to every movie by the Bayesian ranking
+    LEADERBOARD_REFRESH_SECONDS: float = 1
+    LEADERBOARD_REBUILD_SECONDS: int = 60 * 60
+    LEADERBOARD_PRIOR_WEIGHT: int = 10
+
     class Config:
         case_sensitive = True
 
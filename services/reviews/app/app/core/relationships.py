@@ -0,0 +1,34 @@
+import json
+import urllib.parse
+import urllib.request
+from typing import List
+from uuid import UUID
+
+from app.core.config import settings
+
+PAGE_SIZE = 100
+# Seconds to wait for a page, so that a slow relationships service doesn't hold a worker thread forever
+TIMEOUT = 5
+
+
+def generate_base_url(service_name: str, api_prefix: str) -> str:
+    return f"http://{service_name}:80{api_prefix}/"
+
+
+def fetch_followed_user_ids(user_id: UUID) -> List[UUID]:
+    """
+    Ids of all users followed by `user_id`, read page by page from the relationships service.
+    """
+    base_url = generate_base_url(settings.RELATIONSHIPS_SERVICE_NAME, settings.API_RELATIONSHIPS)
+    followed_user_ids = []
+
+    while True:
+        # Pages are read in a stable order, an unordered OFFSET could skip or repeat followed users
+        query = urllib.parse.urlencode({'skip': len(followed_user_ids), 'limit': PAGE_SIZE, 'count': 'none',
+                                        'sort': 'created', 'sort_dir': 'asc'})
+        with urllib.request.urlopen(f"{base_url}followed-by/{user_id}?{query}", timeout=TIMEOUT) as resp:
+            relationships = json.loads(resp.read().decode('utf-8'))['relationships']
+
+        followed_user_ids.extend(UUID(r['followed_user_id']) for r in relationships)
+        if len(relationships) < PAGE_SIZE:
+            return followed_user_ids
@@ -1 +1,4 @@
 from .crud_review import review
+from .crud_movie_rating_stats import movie_rating_stats
+from .crud_feed import feed
+from .crud_review_async import async_review
@@ -0,0 +1,86 @@
+from typing import List, Optional
+from uuid import UUID
+
+from app.crud.total_count import TotalCounter, estimate_count
+from app.db.models import Review, FeedFollow, FeedEntry
+from app.schemas import ReviewsCursor, CountMode
+from sqlalchemy import select, literal, tuple_, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# Feeds are scrolled rather than paged, so their size is not counted unless asked for
+feed_counter = TotalCounter(default_mode=CountMode.none)
+
+
+class CRUDFeed:
+    """
+    Fan-out-on-write timelines: every review is copied to the feeds of its author's followers,
+    so reading a feed page is one index range scan, regardless of how many users are followed.
+    """
+
+    def get_following(self, db: Session, *, user_id: UUID) -> List[UUID]:
+        return [followed_user_id for followed_user_id, in db.query(FeedFollow.followed_user_id)
+                .filter(FeedFollow.user_id == user_id).all()]
+
+    def set_following(self, db: Session, *, user_id: UUID, followed_user_ids: List[UUID]) -> List[UUID]:
+        current = set(self.get_following(db, user_id=user_id))
+        requested = set(followed_user_ids) - {user_id}
+        added = list(requested - current)
+        removed = list(current - requested)
+
+        if removed:
+            db.query(FeedFollow).filter(FeedFollow.user_id == user_id,
+                                        FeedFollow.followed_user_id.in_(removed)) \
+                .delete(synchronize_session=False)
+            db.query(FeedEntry).filter(FeedEntry.owner_id == user_id,
+                                       FeedEntry.author_id.in_(removed)) \
+                .delete(synchronize_session=False)
+
+        if added:
+            db.execute(insert(FeedFollow).values([
+                {'user_id': user_id, 'followed_user_id': followed_user_id} for followed_user_id in added
+            ]).on_conflict_do_nothing())
+
+            # Backfill the timeline with reviews written before the follow
+            reviews = select([literal(user_id, FeedEntry.owner_id.type), Review.created, Review.id, Review.user_id]) \
+                .where(Review.user_id.in_(added))
+            db.execute(insert(FeedEntry).from_select(
+                ['owner_id', 'created', 'review_id', 'author_id'], reviews
+            ).on_conflict_do_nothing())
+
+        db.commit()
+        return list(requested)
+
+    def get_feed(self, db: Session, *, user_id: UUID, limit: int = 100,
+                 cursor: Optional[ReviewsCursor] = None) -> List[Review]:
+        query = db.query(Review).join(FeedEntry, FeedEntry.review_id == Review.id) \
+            .filter(FeedEntry.owner_id == user_id)
+
+        if cursor:
+            query = query.filter(tuple_(FeedEntry.created, FeedEntry.review_id) < tuple_(cursor.created, cursor.id))
+
+        return query.order_by(FeedEntry.created.desc(), FeedEntry.review_id.desc()).limit(limit).all()
+
+    def count(self, db: Session, *, user_id: UUID, mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(FeedEntry.review_id).filter(FeedEntry.owner_id == user_id)
+
+        return feed_counter.count(
+            mode=mode,
+            exact=lambda: query.with_entities(func.count(FeedEntry.review_id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
+
+    def fan_out(self, db: Session, *, review_ids: List[UUID]) -> None:
+        followers = select([FeedFollow.user_id, Review.created, Review.id, Review.user_id]) \
+            .select_from(Review.__table__.join(FeedFollow.__table__, FeedFollow.followed_user_id == Review.user_id)) \
+            .where(Review.id.in_(review_ids))
+
+        db.execute(insert(FeedEntry).from_select(
+            ['owner_id', 'created', 'review_id', 'author_id'], followers
+        ).on_conflict_do_nothing())
+
+    def remove_review(self, db: Session, *, review_id: UUID) -> None:
+        db.query(FeedEntry).filter(FeedEntry.review_id == review_id).delete(synchronize_session=False)
+
+
+feed = CRUDFeed()
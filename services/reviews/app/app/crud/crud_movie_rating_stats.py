@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from app.db.models import Review, MovieRatingStats
+from sqlalchemy import func, cast, select, Float
+from sqlalchemy.dialects.postgresql import insert, array
+from sqlalchemy.orm import Session
+
+
+RATINGS = range(1, 11)
+
+
+def calculate_average(rating_sum, rating_count):
+    return cast(rating_sum, Float) / func.nullif(rating_count, 0)
+
+
+def build_histogram(ratings: List[int]) -> List[int]:
+    return [ratings.count(rating) for rating in RATINGS]
+
+
+def add_histograms(histogram, other):
+    # Element-wise sum of two `integer[]` expressions (Postgres arrays are indexed from 1)
+    return array([histogram[rating] + other[rating] for rating in RATINGS])
+
+
+class CRUDMovieRatingStats:
+    """
+    Per-movie rating aggregates kept in sync with the `review` table.
+
+    Writers call `add_rating`/`remove_rating` inside their own transaction,
+    so the aggregates are committed (or rolled back) together with the review.
+    """
+
+    def get(self, db: Session, *, movie_id: UUID) -> Optional[MovieRatingStats]:
+        return db.query(MovieRatingStats).filter(MovieRatingStats.movie_id == movie_id).first()
+
+    def get_multi_by_movies(self, db: Session, *, movie_ids: List[UUID]) -> List[MovieRatingStats]:
+        return db.query(MovieRatingStats).filter(MovieRatingStats.movie_id.in_(movie_ids)).all()
+
+    def get_all_rated(self, db: Session) -> List[MovieRatingStats]:
+        return db.query(MovieRatingStats).filter(MovieRatingStats.rating_count > 0).all()
+
+    def get_updated_since(self, db: Session, *, since: datetime) -> List[MovieRatingStats]:
+        return db.query(MovieRatingStats).filter(MovieRatingStats.updated >= since).all()
+
+    def add_rating(self, db: Session, *, movie_id: UUID, rating: int) -> None:
+        self.add_ratings(db, ratings=[(movie_id, rating)])
+
+    def add_ratings(self, db: Session, *, ratings: List[Tuple[UUID, int]]) -> None:
+        movie_ratings = {}
+        for movie_id, rating in ratings:
+            movie_ratings.setdefault(movie_id, []).append(rating)
+
+        # Rows are locked in the same order by every writer, so concurrent inserts cannot deadlock
+        stmt = insert(MovieRatingStats).values([dict(
+            movie_id=movie_id,
+            rating_sum=sum(ratings),
+            rating_count=len(ratings),
+            rating_avg=sum(ratings) / len(ratings),
+            rating_histogram=build_histogram(ratings)
+        ) for movie_id, ratings in sorted(movie_ratings.items())])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MovieRatingStats.movie_id],
+            set_={
+                'rating_sum': MovieRatingStats.rating_sum + stmt.excluded.rating_sum,
+                'rating_count': MovieRatingStats.rating_count + stmt.excluded.rating_count,
+                'rating_avg': calculate_average(MovieRatingStats.rating_sum + stmt.excluded.rating_sum,
+                                                MovieRatingStats.rating_count + stmt.excluded.rating_count),
+                'rating_histogram': add_histograms(MovieRatingStats.rating_histogram,
+                                                   stmt.excluded.rating_histogram),
+                'updated': func.now()
+            }
+        )
+        db.execute(stmt)
+
+    def remove_rating(self, db: Session, *, movie_id: UUID, rating: int) -> None:
+        db.query(MovieRatingStats).filter(MovieRatingStats.movie_id == movie_id).update({
+            MovieRatingStats.rating_sum: MovieRatingStats.rating_sum - rating,
+            MovieRatingStats.rating_count: MovieRatingStats.rating_count - 1,
+            MovieRatingStats.rating_avg: calculate_average(MovieRatingStats.rating_sum - rating,
+                                                           MovieRatingStats.rating_count - 1),
+            MovieRatingStats.rating_histogram: array([
+                MovieRatingStats.rating_histogram[r] - 1 if r == rating else MovieRatingStats.rating_histogram[r]
+                for r in RATINGS
+            ]),
+            MovieRatingStats.updated: func.now()
+        }, synchronize_session=False)
+
+    def rebuild(self, db: Session) -> None:
+        # Block review writes (but not reads) until the new aggregates are committed
+        db.execute("LOCK TABLE review IN SHARE MODE")
+        db.query(MovieRatingStats).delete(synchronize_session=False)
+
+        aggregates = select([
+            Review.movie_id,
+            func.sum(Review.rating),
+            func.count(Review.id),
+            cast(func.avg(Review.rating), Float),
+            array([func.count(Review.id).filter(Review.rating == rating) for rating in RATINGS])
+        ]).group_by(Review.movie_id)
+
+        db.execute(insert(MovieRatingStats).from_select(
+            ['movie_id', 'rating_sum', 'rating_count', 'rating_avg', 'rating_histogram'], aggregates
+        ))
+        db.commit()
+
+
+movie_rating_stats = CRUDMovieRatingStats()
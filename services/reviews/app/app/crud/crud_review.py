@@ -1,39 +1,86 @@
+import uuid
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.db.models import Review
-from app.schemas import ReviewCreate, ReviewUpdate, SortingDir, ReviewsSortingModel, MoviesSortingModel
-from sqlalchemy import func
+from app.crud.crud_feed import feed
+from app.crud.crud_movie_rating_stats import movie_rating_stats
+from app.crud.leaderboard import movie_leaderboards
+from app.crud.total_count import TotalCounter, estimate_count
+from app.db.models import Review, MovieRatingStats
+from app.schemas import ReviewCreate, ReviewUpdate, SortingDir, ReviewsSortingModel, MoviesSortingModel, \
+    ReviewsCursor, CountMode
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 
 
+def to_naive_utc(value: datetime) -> datetime:
+    # `review.created` is stored without a time zone, which asyncpg (unlike psycopg2) won't convert to
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def determine_reviews_sorting_key(sort: ReviewsSortingModel):
+    return Review.rating if sort == ReviewsSortingModel.rating else Review.created
+
+
 def determine_reviews_sorting_type(sort: ReviewsSortingModel, sort_dir: SortingDir):
-    sorting_method = None
+    # Review id breaks ties between equal keys, which keeps the order stable for cursors
+    key = determine_reviews_sorting_key(sort)
+
+    if sort_dir == SortingDir.asc:
+        return [key.asc(), Review.id.asc()]
+    else:
+        return [key.desc(), Review.id.desc()]
+
+
+def determine_keyset_filter(cursor: ReviewsCursor):
+    key = determine_reviews_sorting_key(cursor.sort)
+    value = getattr(cursor, cursor.sort.value)
+
+    if cursor.sort_dir == SortingDir.asc:
+        return tuple_(key, Review.id) > tuple_(value, cursor.id)
+    else:
+        return tuple_(key, Review.id) < tuple_(value, cursor.id)
+
 
-    if sort == ReviewsSortingModel.rating:
-        sorting_method = Review.rating.desc() if sort_dir == SortingDir.desc else Review.rating.asc()
-    elif sort == ReviewsSortingModel.created:
-        sorting_method = Review.created.desc() if sort_dir == SortingDir.desc else Review.created.asc()
+def page_reviews(query, *, skip: int, limit: int, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                 cursor: Optional[ReviewsCursor]):
+    # Works for both ORM queries and Core selects, which the asyncio data path uses
+    query = query.order_by(*determine_reviews_sorting_type(sort, sort_dir))
 
-    return sorting_method
+    if cursor:
+        query = query.filter(determine_keyset_filter(cursor))
+    else:
+        query = query.offset(skip)
 
+    return query.limit(limit)
 
-def determine_movies_sorting_type(sort: MoviesSortingModel, sort_dir: SortingDir):
-    sorting_method = None
 
-    if sort == MoviesSortingModel.rating_count:
-        sorting_method = func.count(Review.id).desc() if sort_dir == SortingDir.desc else func.count(Review.id).asc()
-    elif sort == MoviesSortingModel.avg_rating:
-        sorting_method = func.avg(Review.rating).desc() if sort_dir == SortingDir.desc else func.avg(
-            Review.rating).asc()
+def paginate_reviews(query, *, skip: int, limit: int, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                     cursor: Optional[ReviewsCursor]) -> List[Review]:
+    return page_reviews(query, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor).all()
 
-    return sorting_method
+
+# Number of rows inserted by a single statement of a bulk insert
+BULK_CHUNK_SIZE = 1000
+
+# Totals of whole tables may lag behind by COUNT_CACHE_TTL, unless asked for with count=exact
+reviews_counter = TotalCounter(default_mode=CountMode.cached, ttl=settings.COUNT_CACHE_TTL)
+movie_reviews_counter = TotalCounter()
+user_reviews_counter = TotalCounter()
+
+
+def invalidate_aggregates() -> None:
+    reviews_counter.invalidate()
+    movie_leaderboards.mark_stale()
 
 
 def determine_filter_type(created_gte: Optional[datetime], user_id: Optional[List[UUID]]):
     filter_type = None
+    created_gte = created_gte and to_naive_utc(created_gte)
 
     if created_gte and user_id:
         filter_type = [Review.created >= created_gte, Review.user_id.in_(user_id)]
@@ -46,60 +93,87 @@ def determine_filter_type(created_gte: Optional[datetime], user_id: Optional[Lis
 
 
 class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewUpdate]):
-    def create(self, db: Session, *, obj_in: ReviewCreate):
-        db_obj = Review(
+    def create(self, db: Session, *, obj_in: ReviewCreate) -> Optional[Review]:
+        return self.create_multi(db, objs_in=[obj_in])[0]
+
+    def create_with_date(self, db: Session, *, obj_in: ReviewCreate, creation_time: datetime) -> Optional[Review]:
+        return self.create_multi(db, objs_in=[obj_in], creation_time=creation_time)[0]
+
+    def create_multi(self, db: Session, *, objs_in: List[ReviewCreate],
+                     creation_time: Optional[datetime] = None) -> List[Optional[Review]]:
+        """
+        Insert reviews relying on the unique (user_id, movie_id) index instead of checking for existing ones.
+
+        Returns the created review for every item, or None where the user has already reviewed the movie.
+        """
+        created = to_naive_utc(creation_time or datetime.now(timezone.utc))
+        rows = [dict(
+            id=uuid.uuid4(),
             user_id=obj_in.user_id,
             movie_id=obj_in.movie_id,
             rating=obj_in.rating,
             comment=obj_in.comment,
-            created=datetime.now(timezone.utc)
-        )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+            created=created
+        ) for obj_in in objs_in]
+
+        inserted = {}
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            stmt = insert(Review).values(rows[start:start + BULK_CHUNK_SIZE]) \
+                .on_conflict_do_nothing(index_elements=[Review.user_id, Review.movie_id]) \
+                .returning(*Review.__table__.columns)
+            inserted.update((review.id, review) for review in db.execute(stmt))
+
+        if inserted:
+            movie_rating_stats.add_ratings(db, ratings=[(review.movie_id, review.rating)
+                                                        for review in inserted.values()])
+            feed.fan_out(db, review_ids=list(inserted))
 
-    def create_with_date(self, db: Session, *, obj_in: ReviewCreate, creation_time: datetime):
-        db_obj = Review(
-            user_id=obj_in.user_id,
-            movie_id=obj_in.movie_id,
-            rating=obj_in.rating,
-            comment=obj_in.comment,
-            created=creation_time
-        )
-        db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        invalidate_aggregates()
+        return [inserted.get(row['id']) for row in rows]
+
+    def remove(self, db: Session, *, id: UUID) -> Review:
+        obj = db.query(self.model).get(id)
+        db.delete(obj)
+        movie_rating_stats.remove_rating(db, movie_id=obj.movie_id, rating=obj.rating)
+        feed.remove_review(db, review_id=obj.id)
+        db.commit()
+        invalidate_aggregates()
+        return obj
 
     def get_by_user(self, db: Session, *, skip: int = 0, limit: int = 100,
-                    user_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir) -> List[Review]:
-        return db.query(self.model).filter(Review.user_id == user_id) \
-            .order_by(determine_reviews_sorting_type(sort, sort_dir)).offset(skip).limit(limit).all()
+                    user_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                    cursor: Optional[ReviewsCursor] = None) -> List[Review]:
+        query = db.query(self.model).filter(Review.user_id == user_id)
+        return paginate_reviews(query, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor)
 
     def get_by_movie(self, db: Session, *, skip: int = 0, limit: int = 100,
-                     movie_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir) -> List[Review]:
-        return db.query(self.model).filter(Review.movie_id == movie_id) \
-            .order_by(determine_reviews_sorting_type(sort, sort_dir)).offset(skip).limit(limit).all()
+                     movie_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                     cursor: Optional[ReviewsCursor] = None) -> List[Review]:
+        query = db.query(self.model).filter(Review.movie_id == movie_id)
+        return paginate_reviews(query, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor)
 
     def get_by_user_and_movie(self, db: Session, *, user_id: UUID, movie_id: UUID) -> Review:
         return db.query(self.model).filter(Review.user_id == user_id, Review.movie_id == movie_id).first()
 
     def get_multi_sort(self, db: Session, *, skip: int = 0, limit: int = 100,
                        sort: ReviewsSortingModel, sort_dir: SortingDir,
-                       created_gte: Optional[datetime], user_id: Optional[List[UUID]]) -> List[Review]:
+                       created_gte: Optional[datetime], user_id: Optional[List[UUID]],
+                       cursor: Optional[ReviewsCursor] = None) -> List[Review]:
         if not user_id and not created_gte:
-            return db.query(self.model).order_by(determine_reviews_sorting_type(sort, sort_dir)) \
-                .offset(skip).limit(limit).all()
+            query = db.query(self.model)
         else:
-            return db.query(self.model).filter(*determine_filter_type(created_gte, user_id)) \
-                .order_by(determine_reviews_sorting_type(sort, sort_dir)).offset(skip).limit(limit).all()
+            query = db.query(self.model).filter(*determine_filter_type(created_gte, user_id))
+
+        return paginate_reviews(query, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor)
 
-    def get_average_by_movie(self, db: Session, *, movie_id: UUID):
-        return db.query(self.model).with_entities(func.avg(Review.rating)).filter(Review.movie_id == movie_id).first()
+    def get_average_by_movie(self, db: Session, *, movie_id: UUID) -> Optional[float]:
+        stats = movie_rating_stats.get(db, movie_id=movie_id)
+        return stats.rating_avg if stats else None
 
-    def get_count_by_movie(self, db: Session, *, movie_id: UUID):
-        return db.query(self.model).with_entities(func.count(Review.rating)).filter(Review.movie_id == movie_id).first()
+    def get_count_by_movie(self, db: Session, *, movie_id: UUID) -> int:
+        stats = movie_rating_stats.get(db, movie_id=movie_id)
+        return stats.rating_count if stats else 0
 
     def get_average_by_user(self, db: Session, *, user_id: UUID):
         return db.query(self.model).with_entities(func.avg(Review.rating)).filter(Review.user_id == user_id).first()
@@ -107,16 +181,52 @@ class CRUDReview(CRUDBase[Review, ReviewCreate, ReviewUpdate]):
     def get_count_by_user(self, db: Session, *, user_id: UUID):
         return db.query(self.model).with_entities(func.count(Review.rating)).filter(Review.user_id == user_id).first()
 
+    def get_stats_by_movies(self, db: Session, *, movie_ids: List[UUID]):
+        return [(stats.movie_id, stats.rating_avg, stats.rating_count)
+                for stats in movie_rating_stats.get_multi_by_movies(db, movie_ids=movie_ids)]
+
+    def get_stats_by_users(self, db: Session, *, user_ids: List[UUID]):
+        return db.query(Review.user_id, func.avg(Review.rating), func.count(Review.id)) \
+            .filter(Review.user_id.in_(user_ids)).group_by(Review.user_id).all()
+
     def get_movies_sort(self, db: Session, *, skip: int = 0, limit: int = 100,
                         sort: MoviesSortingModel, sort_dir: SortingDir) -> List[UUID]:
-        return db.query(self.model.movie_id).group_by(Review.movie_id) \
-            .order_by(determine_movies_sorting_type(sort, sort_dir)).offset(skip).limit(limit).all()
+        if sort is None:
+            return [movie_id for movie_id, in db.query(MovieRatingStats.movie_id)
+                    .filter(MovieRatingStats.rating_count > 0).offset(skip).limit(limit).all()]
 
-    def count_all(self, db: Session, *, created_gte: Optional[datetime], user_id: Optional[List[UUID]]) -> int:
+        return movie_leaderboards.page(db, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir)
+
+    def count_all(self, db: Session, *, created_gte: Optional[datetime], user_id: Optional[List[UUID]],
+                  mode: Optional[CountMode] = None) -> Optional[int]:
         if not user_id and not created_gte:
-            return db.query(func.count(Review.id)).first()[0]
+            query = db.query(Review.id)
         else:
-            return db.query(func.count(Review.id)).filter(*determine_filter_type(created_gte, user_id)).first()[0]
+            query = db.query(Review.id).filter(*determine_filter_type(created_gte, user_id))
+
+        return reviews_counter.count(
+            mode=mode,
+            key=(created_gte, tuple(sorted(user_id or []))),
+            exact=lambda: query.with_entities(func.count(Review.id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
+
+    def count_by_movie(self, db: Session, *, movie_id: UUID, mode: Optional[CountMode] = None) -> Optional[int]:
+        # Both modes read the precomputed movie stats, which is as cheap as an estimate
+        return movie_reviews_counter.count(
+            mode=mode,
+            exact=lambda: self.get_count_by_movie(db, movie_id=movie_id),
+            estimate=lambda: self.get_count_by_movie(db, movie_id=movie_id)
+        )
+
+    def count_by_user(self, db: Session, *, user_id: UUID, mode: Optional[CountMode] = None) -> Optional[int]:
+        query = db.query(Review.id).filter(Review.user_id == user_id)
+
+        return user_reviews_counter.count(
+            mode=mode,
+            exact=lambda: query.with_entities(func.count(Review.id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
 
 
 review = CRUDReview(Review)
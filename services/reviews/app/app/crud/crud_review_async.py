@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from uuid import UUID
+
+from app.crud.crud_review import review, page_reviews, determine_filter_type, to_naive_utc, \
+    reviews_counter, movie_reviews_counter, user_reviews_counter
+from app.crud.total_count import estimate_count_async
+from app.db.models import Review, MovieRatingStats
+from app.schemas import ReviewCreate, SortingDir, ReviewsSortingModel, ReviewsCursor, CountMode
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncCRUDReview:
+    """
+    `CRUDReview` for asyncpg sessions, used by the `async def` endpoints.
+
+    Reads are issued as Core statements, writes run the synchronous `CRUDReview` through `run_sync`,
+    so the rating aggregates and feeds are maintained in one place. An `AsyncSession` runs one
+    statement at a time, queries meant to run concurrently need sessions of their own.
+    """
+
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[Review]:
+        return await db.get(Review, id)
+
+    async def get_by_user_and_movie(self, db: AsyncSession, *, user_id: UUID, movie_id: UUID) -> Optional[Review]:
+        result = await db.execute(select(Review).where(Review.user_id == user_id, Review.movie_id == movie_id))
+        return result.scalars().first()
+
+    async def get_by_user(self, db: AsyncSession, *, skip: int = 0, limit: int = 100,
+                          user_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                          cursor: Optional[ReviewsCursor] = None) -> List[Review]:
+        stmt = select(Review).where(Review.user_id == user_id)
+        return await self._paginate(db, stmt, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor)
+
+    async def get_by_movie(self, db: AsyncSession, *, skip: int = 0, limit: int = 100,
+                           movie_id: UUID, sort: ReviewsSortingModel, sort_dir: SortingDir,
+                           cursor: Optional[ReviewsCursor] = None) -> List[Review]:
+        stmt = select(Review).where(Review.movie_id == movie_id)
+        return await self._paginate(db, stmt, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor)
+
+    async def get_multi_sort(self, db: AsyncSession, *, skip: int = 0, limit: int = 100,
+                             sort: ReviewsSortingModel, sort_dir: SortingDir,
+                             created_gte: Optional[datetime], user_id: Optional[List[UUID]],
+                             cursor: Optional[ReviewsCursor] = None, columns: Optional[List] = None) -> List[Review]:
+        # Selected `columns` are returned as plain rows, which are cheaper to load than `Review` objects
+        stmt = select(*(columns or [Review]))
+        if user_id or created_gte:
+            stmt = stmt.where(*determine_filter_type(created_gte, user_id))
+
+        return await self._paginate(db, stmt, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir, cursor=cursor,
+                                    scalars=not columns)
+
+    async def get_average_by_movie(self, db: AsyncSession, *, movie_id: UUID) -> Optional[float]:
+        stats = await db.get(MovieRatingStats, movie_id)
+        return stats.rating_avg if stats else None
+
+    async def get_count_by_movie(self, db: AsyncSession, *, movie_id: UUID) -> int:
+        stats = await db.get(MovieRatingStats, movie_id)
+        return stats.rating_count if stats else 0
+
+    async def get_histogram_by_movie(self, db: AsyncSession, *, movie_id: UUID) -> Optional[List[int]]:
+        stats = await db.get(MovieRatingStats, movie_id)
+        return stats.rating_histogram if stats else None
+
+    async def get_histograms_by_movies(self, db: AsyncSession, *, movie_ids: List[UUID]):
+        result = await db.execute(select(MovieRatingStats.movie_id, MovieRatingStats.rating_histogram)
+                                  .where(MovieRatingStats.movie_id.in_(movie_ids)))
+        return result.all()
+
+    async def get_average_by_user(self, db: AsyncSession, *, user_id: UUID) -> Optional[float]:
+        return await db.scalar(select(func.avg(Review.rating)).where(Review.user_id == user_id))
+
+    async def get_count_by_user(self, db: AsyncSession, *, user_id: UUID) -> int:
+        return await db.scalar(select(func.count(Review.rating)).where(Review.user_id == user_id))
+
+    async def get_stats_by_movies(self, db: AsyncSession, *, movie_ids: List[UUID]):
+        result = await db.execute(select(MovieRatingStats.movie_id, MovieRatingStats.rating_avg,
+                                         MovieRatingStats.rating_count)
+                                  .where(MovieRatingStats.movie_id.in_(movie_ids)))
+        return result.all()
+
+    async def get_stats_by_users(self, db: AsyncSession, *, user_ids: List[UUID]):
+        result = await db.execute(select(Review.user_id, func.avg(Review.rating), func.count(Review.id))
+                                  .where(Review.user_id.in_(user_ids)).group_by(Review.user_id))
+        return result.all()
+
+    async def count_all(self, db: AsyncSession, *, created_gte: Optional[datetime], user_id: Optional[List[UUID]],
+                        mode: Optional[CountMode] = None) -> Optional[int]:
+        stmt = select(Review.id)
+        if user_id or created_gte:
+            stmt = stmt.where(*determine_filter_type(created_gte, user_id))
+
+        return await reviews_counter.count_async(
+            mode=mode,
+            key=(created_gte, tuple(sorted(user_id or []))),
+            exact=lambda: db.scalar(stmt.with_only_columns([func.count(Review.id)])),
+            estimate=lambda: estimate_count_async(db, stmt)
+        )
+
+    async def count_by_movie(self, db: AsyncSession, *, movie_id: UUID,
+                             mode: Optional[CountMode] = None) -> Optional[int]:
+        return await movie_reviews_counter.count_async(
+            mode=mode,
+            exact=lambda: self.get_count_by_movie(db, movie_id=movie_id),
+            estimate=lambda: self.get_count_by_movie(db, movie_id=movie_id)
+        )
+
+    async def count_by_user(self, db: AsyncSession, *, user_id: UUID,
+                            mode: Optional[CountMode] = None) -> Optional[int]:
+        stmt = select(Review.id).where(Review.user_id == user_id)
+
+        return await user_reviews_counter.count_async(
+            mode=mode,
+            exact=lambda: db.scalar(stmt.with_only_columns([func.count(Review.id)])),
+            estimate=lambda: estimate_count_async(db, stmt)
+        )
+
+    async def stream_multi(self, db: AsyncSession, *, created_gte: Optional[datetime] = None,
+                           user_id: Optional[List[UUID]] = None, movie_id: Optional[List[UUID]] = None,
+                           batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """
+        Reviews read from a server-side cursor in batches of `batch_size` rows, oldest first.
+
+        Rows are plain tuples rather than ORM objects, so neither the session nor the cursor
+        hold more than one batch, however many reviews there are.
+        """
+        stmt = select(Review.__table__).order_by(Review.created, Review.id)
+        if created_gte:
+            stmt = stmt.where(Review.created >= to_naive_utc(created_gte))
+        if user_id:
+            stmt = stmt.where(Review.user_id.in_(user_id))
+        if movie_id:
+            stmt = stmt.where(Review.movie_id.in_(movie_id))
+
+        # `stream` declares a server-side cursor (stream_results), which is fetched from one batch at a time
+        result = await db.stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield rows
+
+    async def create(self, db: AsyncSession, *, obj_in: ReviewCreate) -> Optional[Review]:
+        return await db.run_sync(lambda session: review.create(session, obj_in=obj_in))
+
+    async def create_multi(self, db: AsyncSession, *, objs_in: List[ReviewCreate]) -> List[Optional[Review]]:
+        return await db.run_sync(lambda session: review.create_multi(session, objs_in=objs_in))
+
+    async def remove(self, db: AsyncSession, *, id: UUID) -> Review:
+        return await db.run_sync(lambda session: review.remove(session, id=id))
+
+    async def _paginate(self, db: AsyncSession, stmt, *, skip: int, limit: int, sort: ReviewsSortingModel,
+                        sort_dir: SortingDir, cursor: Optional[ReviewsCursor], scalars: bool = True) -> List[Review]:
+        result = await db.execute(page_reviews(stmt, skip=skip, limit=limit, sort=sort, sort_dir=sort_dir,
+                                               cursor=cursor))
+        return result.scalars().all() if scalars else result.all()
+
+
+async_review = AsyncCRUDReview()
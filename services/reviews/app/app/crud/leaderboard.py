@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from sortedcontainers import SortedKeyList
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.crud_movie_rating_stats import movie_rating_stats
+from app.schemas import SortingDir, MoviesSortingModel
+
+MovieScore = namedtuple('MovieScore', ['movie_id', 'rating_sum', 'rating_count', 'rating_avg'])
+
+# Transactions committing later than they started may be stamped in the past, look back to catch them
+UPDATES_LOOKBACK = timedelta(seconds=60)
+
+
+def calculate_prior_mean(scores: List[MovieScore]) -> float:
+    rating_count = sum(score.rating_count for score in scores)
+    return sum(score.rating_sum for score in scores) / rating_count if rating_count else 0.0
+
+
+class MovieLeaderboards:
+    def __init__(self, *, refresh_interval: float, rebuild_interval: float, prior_weight: int):
+        """
+        Movie rankings for every `MoviesSortingModel`, kept in memory of the worker.
+
+        **Parameters**
+
+        * `refresh_interval`: Seconds after which rows updated by other workers are read
+        * `rebuild_interval`: Seconds after which rankings are built from scratch
+        * `prior_weight`: Number of votes with the mean rating added to every movie by the Bayesian ranking
+
+        Rankings are sorted lists, so reading a page costs O(log n + page size) and applying
+        an updated `movie_rating_stats` row costs O(log n).
+        """
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.prior_weight = prior_weight
+        self.prior_mean = 0.0
+
+        self._scores = {}
+        self._rankings = {}
+        self._updated_since = None
+        self._built_at = None
+        self._refreshed_at = None
+        self._stale = False
+        self._reading = False
+        self._lock = threading.Lock()
+
+    def bayesian_average(self, score: MovieScore, prior_mean: Optional[float] = None) -> float:
+        prior_mean = self.prior_mean if prior_mean is None else prior_mean
+        return (self.prior_weight * prior_mean + score.rating_sum) / (self.prior_weight + score.rating_count)
+
+    def page(self, db: Session, *, skip: int = 0, limit: int = 100,
+             sort: MoviesSortingModel, sort_dir: SortingDir) -> List[UUID]:
+        self._ensure_fresh(db)
+
+        with self._lock:
+            ranking = self._rankings[sort]
+            if sort_dir == SortingDir.desc:
+                stop = len(ranking) - skip
+                scores = ranking.islice(max(stop - limit, 0), max(stop, 0), reverse=True)
+            else:
+                scores = ranking.islice(skip, skip + limit)
+
+            return [score.movie_id for score in scores]
+
+    def mark_stale(self) -> None:
+        """
+        Read updated rows on the next request instead of waiting for `refresh_interval`.
+        """
+        self._stale = True
+
+    def _ensure_fresh(self, db: Session) -> None:
+        # The database is read outside the lock by one request at a time, the others keep reading
+        # the current rankings meanwhile. Only before the first build they all have to read it.
+        with self._lock:
+            now = time.monotonic()
+
+            if self._built_at is None:
+                rebuild = True
+            elif self._reading:
+                return
+            elif now - self._built_at >= self.rebuild_interval or self._updated_since is None:
+                rebuild = True
+            elif self._stale or now - self._refreshed_at >= self.refresh_interval:
+                rebuild = False
+            else:
+                return
+
+            # Marks made from now on are read by the next refresh
+            self._stale = False
+            self._refreshed_at = now
+            self._reading = True
+            since = self._updated_since
+
+        try:
+            if rebuild:
+                self._rebuild(db)
+            else:
+                self._refresh(db, since=since)
+        finally:
+            self._reading = False
+
+    def _rebuild(self, db: Session) -> None:
+        rows = movie_rating_stats.get_all_rated(db)
+        scores = [MovieScore(row.movie_id, row.rating_sum, row.rating_count, row.rating_avg) for row in rows]
+
+        prior_mean = calculate_prior_mean(scores)
+        rankings = {
+            MoviesSortingModel.avg_rating: SortedKeyList(scores, key=lambda s: (s.rating_avg, s.movie_id)),
+            MoviesSortingModel.rating_count: SortedKeyList(scores, key=lambda s: (s.rating_count, s.movie_id)),
+            MoviesSortingModel.bayesian_avg: SortedKeyList(scores, key=lambda s: (self.bayesian_average(s, prior_mean),
+                                                                                  s.movie_id)),
+        }
+        updated_since = max((row.updated for row in rows), default=None)
+
+        with self._lock:
+            self.prior_mean = prior_mean
+            self._scores = {score.movie_id: score for score in scores}
+            self._rankings = rankings
+            self._updated_since = updated_since
+            self._built_at = time.monotonic()
+
+    def _refresh(self, db: Session, *, since: datetime) -> None:
+        rows = movie_rating_stats.get_updated_since(db, since=since - UPDATES_LOOKBACK)
+
+        with self._lock:
+            for row in rows:
+                self._apply(MovieScore(row.movie_id, row.rating_sum, row.rating_count, row.rating_avg))
+                self._updated_since = max(self._updated_since, row.updated)
+
+    def _apply(self, score: MovieScore) -> None:
+        previous = self._scores.pop(score.movie_id, None)
+        if previous == score:
+            self._scores[score.movie_id] = score
+            return
+
+        if previous is not None:
+            for ranking in self._rankings.values():
+                ranking.remove(previous)
+
+        if score.rating_count > 0:
+            self._scores[score.movie_id] = score
+            for ranking in self._rankings.values():
+                ranking.add(score)
+
+
+movie_leaderboards = MovieLeaderboards(refresh_interval=settings.LEADERBOARD_REFRESH_SECONDS,
+                                       rebuild_interval=settings.LEADERBOARD_REBUILD_SECONDS,
+                                       prior_weight=settings.LEADERBOARD_PRIOR_WEIGHT)
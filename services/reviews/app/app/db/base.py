@@ -3,3 +3,5 @@
 
 from app.db.base_class import Base  # noqa
 from app.db.models.review import Review  # noqa
+from app.db.models.movie_rating_stats import MovieRatingStats  # noqa
+from app.db.models.feed import FeedFollow, FeedEntry  # noqa
@@ -11,6 +11,8 @@ from uuid import UUID
 
 from app import crud, schemas
 from app.db.models.review import Review
+from app.db.models.movie_rating_stats import MovieRatingStats
+from app.db.models.feed import FeedFollow, FeedEntry
 from app.core.config import settings
 
 
@@ -54,6 +56,9 @@ def init_db(db: Session) -> None:
     ]
 
     db.query(Review).delete()
+    db.query(MovieRatingStats).delete()
+    db.query(FeedEntry).delete()
+    db.query(FeedFollow).delete()
     for movie_id in movie_ids:
         for user_id in random.sample(user_ids, reviews_per_movie):
             review = schemas.ReviewCreate(
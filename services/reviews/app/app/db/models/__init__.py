@@ -1 +1,3 @@
 from .review import Review
+from .movie_rating_stats import MovieRatingStats
+from .feed import FeedFollow, FeedEntry
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Index
+
+from app.db.base_class import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class FeedFollow(Base):
+    __tablename__ = "feed_follow"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    followed_user_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+
+
+class FeedEntry(Base):
+    """
+    Review of a followed user, copied to the timeline of every follower when it is written.
+    """
+    __tablename__ = "feed_entry"
+
+    owner_id = Column(UUID(as_uuid=True), primary_key=True)
+    created = Column(DateTime, primary_key=True)
+    review_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    author_id = Column(UUID(as_uuid=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_feed_entry_owner_id_author_id', 'owner_id', 'author_id'),
+    )
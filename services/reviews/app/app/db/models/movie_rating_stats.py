@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, DateTime, func
+
+from app.db.base_class import Base
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+
+
+class MovieRatingStats(Base):
+    __tablename__ = "movie_rating_stats"
+
+    movie_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    rating_sum = Column(BigInteger, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0, index=True)
+    rating_avg = Column(Float, index=True)
+    # Number of reviews with rating 1, 2, ..., 10
+    rating_histogram = Column(ARRAY(Integer, dimensions=1), nullable=False,
+                              server_default='{0,0,0,0,0,0,0,0,0,0}')
+    updated = Column(DateTime, nullable=False, index=True, server_default=func.now())
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, Index
 
 from app.db.base_class import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -12,3 +12,15 @@ class Review(Base):
     rating = Column(Integer, nullable=False)
     comment = Column(String)
     created = Column(DateTime, nullable=False)
+
+    # Composite indexes matching the keyset pagination order (sorting key, id)
+    __table_args__ = (
+        Index('ix_review_created_id', 'created', 'id'),
+        Index('ix_review_rating_id', 'rating', 'id'),
+        Index('ix_review_movie_id_created_id', 'movie_id', 'created', 'id'),
+        Index('ix_review_movie_id_rating_id', 'movie_id', 'rating', 'id'),
+        Index('ix_review_user_id_created_id', 'user_id', 'created', 'id'),
+        Index('ix_review_user_id_rating_id', 'user_id', 'rating', 'id'),
+        # A user reviews a movie once, inserts rely on it instead of checking first
+        Index('ux_review_user_id_movie_id', 'user_id', 'movie_id', unique=True),
+    )
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
@@ -6,3 +8,11 @@ from app.core.config import settings
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_size=settings.POOL_SIZE,
                        max_overflow=settings.POOL_MAX_OVERFLOW, pool_timeout=settings.POOL_TIMEOUT)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# The same database reached through asyncpg, used by the `async def` endpoints
+async_engine = create_async_engine(make_url(settings.DATABASE_URL).set(drivername='postgresql+asyncpg'),
+                                   pool_pre_ping=True, pool_size=settings.POOL_SIZE,
+                                   max_overflow=settings.POOL_MAX_OVERFLOW, pool_timeout=settings.POOL_TIMEOUT)
+# Objects are serialized after the commit, when lazy loading is not possible anymore
+AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=async_engine,
+                                 class_=AsyncSession, expire_on_commit=False)
@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.api.api import api_router
+from app.db.session import async_engine
 
 app = FastAPI(title=settings.SERVICE_NAME,
               openapi_url=f"{settings.API_REVIEWS}/openapi.json")
@@ -24,3 +25,8 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix=settings.API_REVIEWS)
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
@@ -0,0 +1,26 @@
+import logging
+
+from app import crud
+from app.db.session import SessionLocal
+from app.db import base  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild() -> None:
+    db = SessionLocal()
+    try:
+        crud.movie_rating_stats.rebuild(db)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    logger.info("Rebuilding movie rating stats")
+    rebuild()
+    logger.info("Movie rating stats rebuilt")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
-from .review import Review, ReviewCreate, ReviewUpdate, ReviewsInfo, Info
+from .review import Review, ReviewCreate, ReviewUpdate, ReviewsInfo, Info, \
+    ReviewBulkStatus, ReviewBulkResult, ReviewsBulkInfo
 from .sorting import SortingDir
+from .count import CountMode
 from .sorting_reviews import SortingReviews, ReviewsSortingModel
 from .sorting_movies import SortingMovies, MoviesSortingModel
+from .rating_stats import RatingStats
+from .rating_histogram import RatingHistogram
+from .cursor import ReviewsCursor
+from .export import ExportFormat
+from .token import TokenPayload
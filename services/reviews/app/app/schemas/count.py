@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class CountMode(str, Enum):
+    none = "none"
+    estimate = "estimate"
+    cached = "cached"
+    exact = "exact"
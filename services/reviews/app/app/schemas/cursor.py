@@ -0,0 +1,34 @@
+import base64
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from app.schemas import SortingDir, ReviewsSortingModel
+
+
+class ReviewsCursor(BaseModel):
+    """
+    Position right after the last review of a page, opaque to the clients.
+
+    Holds the value of the sorting key (`created` or `rating`) together with
+    the review id, which breaks ties between reviews with equal keys.
+    """
+    sort: ReviewsSortingModel
+    sort_dir: SortingDir
+    created: Optional[datetime]
+    rating: Optional[int]
+    id: UUID
+
+    @classmethod
+    def after(cls, review, sort: ReviewsSortingModel, sort_dir: SortingDir) -> 'ReviewsCursor':
+        return cls(sort=sort, sort_dir=sort_dir, id=review.id, **{sort.value: getattr(review, sort.value)})
+
+    @classmethod
+    def decode(cls, token: str) -> 'ReviewsCursor':
+        padding = '=' * (-len(token) % 4)
+        return cls.parse_raw(base64.urlsafe_b64decode(token + padding))
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.json(exclude_none=True).encode()).decode().rstrip('=')
@@ -0,0 +1,36 @@
+import math
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+def rating_at(histogram: List[int], position: int) -> int:
+    # Rating of the review at `position` (counted from 0) when all reviews are sorted by rating
+    for rating, count in enumerate(histogram, start=1):
+        if position < count:
+            return rating
+        position -= count
+
+    raise IndexError(position)
+
+
+class RatingHistogram(BaseModel):
+    histogram: List[int]
+    count: int
+    median: Optional[float]
+    percentiles: Dict[float, Optional[int]]
+
+    @classmethod
+    def from_histogram(cls, histogram: List[int], percentiles: List[float]) -> 'RatingHistogram':
+        """
+        Median (the mean of the two middle ratings for an even count) and nearest-rank percentiles,
+        read off the histogram rather than from the reviews.
+        """
+        count = sum(histogram)
+        if not count:
+            return cls(histogram=histogram, count=0, median=None, percentiles={p: None for p in percentiles})
+
+        median = (rating_at(histogram, (count - 1) // 2) + rating_at(histogram, count // 2)) / 2
+        return cls(histogram=histogram, count=count, median=median, percentiles={
+            p: rating_at(histogram, max(math.ceil(p / 100 * count), 1) - 1) for p in percentiles
+        })
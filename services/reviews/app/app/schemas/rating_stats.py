@@ -0,0 +1,8 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class RatingStats(BaseModel):
+    avg: Optional[float]
+    count: int
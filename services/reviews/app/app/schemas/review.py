@@ -1,13 +1,14 @@
 from datetime import datetime
+from enum import Enum
 from typing import Optional, List
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conint
 
 
 class Info(BaseModel):
     count: int
-    totalCount: int
+    totalCount: Optional[int]
 
 
 class ReviewBase(BaseModel):
@@ -18,7 +19,7 @@ class ReviewBase(BaseModel):
 
 
 class ReviewCreate(ReviewBase):
-    pass
+    rating: conint(ge=1, le=10)
 
 
 class ReviewUpdate(ReviewBase):
@@ -36,6 +37,23 @@ class Review(ReviewBase):
 class ReviewsInfo(BaseModel):
     reviews: List[Review]
     info: Info
+    next_cursor: Optional[str] = None
     
     class Config:
         orm_mode = True
+
+
+class ReviewBulkStatus(str, Enum):
+    created = "created"
+    already_reviewed = "already_reviewed"
+
+
+class ReviewBulkResult(BaseModel):
+    status: ReviewBulkStatus
+    review: Optional[Review]
+
+
+class ReviewsBulkInfo(BaseModel):
+    results: List[ReviewBulkResult]
+    created: int
+    already_reviewed: int
@@ -8,6 +8,7 @@ from app.schemas import SortingDir
 class MoviesSortingModel(str, Enum):
     avg_rating = "avg_rating"
     rating_count = "rating_count"
+    bayesian_avg = "bayesian_avg"
 
 
 class SortingMovies(BaseModel):
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
-from app.api.api.endpoints import users, login
+from app.api.api.endpoints import users, login, metrics, jwks
 
 api_router = APIRouter()
 api_router.include_router(users.router, tags=["users"])
 api_router.include_router(login.router, tags=["login"])
+api_router.include_router(metrics.router, tags=["metrics"])
+api_router.include_router(jwks.router, tags=["jwks"])
@@ -0,0 +1,22 @@
+from typing import Any
+
+from fastapi import APIRouter, Response
+
+from app.core import security
+from app.core.config import settings
+from app.core.keys import signing_keys
+
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json")
+def read_jwks(response: Response) -> Any:
+    """
+    Public keys verifying the access tokens, selected by the `kid` header of a token.
+    Empty while tokens are signed with the shared secret (HS256).
+    """
+    response.headers["Cache-Control"] = f"public, max-age={settings.JWKS_MAX_AGE}"
+    if settings.JWT_ALGORITHM == security.ALGORITHM:
+        return {"keys": []}
+
+    return signing_keys.jwks()
@@ -1,7 +1,8 @@
 from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -9,19 +10,20 @@ from app import schemas, crud
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.db import models
+from app.core.token_cache import CachedUser
 
 router = APIRouter()
 
 
+# Async, so that logins waiting for the password hashing pool don't hold threads of the threadpool
 @router.post("/login/access-token", response_model=schemas.Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -40,11 +42,58 @@ def login_access_token(
             user.id, expires_delta=access_token_expires
         ),
         "token_type": "bearer",
+        "refresh_token": await run_in_threadpool(crud.refresh_token.issue, db, user_id=user.id),
     }
 
 
+@router.post("/login/refresh", response_model=schemas.Token)
+def login_refresh(
+    db: Session = Depends(deps.get_db), token_in: schemas.RefreshTokenRequest = Body(...)
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and a new refresh token, without the password.
+    The refresh token can't be used again.
+    """
+    rotated = crud.refresh_token.rotate(db, token=token_in.refresh_token)
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid refresh token"
+        )
+    user, refresh_token = rotated
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/login/revoke", response_model=bool)
+def revoke_refresh_token(
+    db: Session = Depends(deps.get_db), token_in: schemas.RefreshTokenRequest = Body(...)
+) -> Any:
+    """
+    Log out: revoke a refresh token together with the tokens rotated from the same login.
+    False if the token is unknown.
+    """
+    return crud.refresh_token.revoke(db, token=token_in.refresh_token)
+
+
+@router.post("/login/revoke-all", response_model=int)
+def revoke_refresh_tokens(
+    db: Session = Depends(deps.get_db), current_user: CachedUser = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Log out everywhere: revoke every refresh token of the current user, returns the number of revoked tokens
+    """
+    return crud.refresh_token.revoke_user(db, user_id=current_user.id)
+
+
 @router.post("/login/test-token", response_model=schemas.User)
-def test_token(current_user: models.User = Depends(deps.get_current_user)) -> Any:
+def test_token(current_user: CachedUser = Depends(deps.get_current_user)) -> Any:
     """
     Test access token
     """
@@ -0,0 +1,26 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app import schemas
+from app.core.hashing import hashing_executor
+from app.core.token_cache import token_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics/hashing", response_model=schemas.HashingMetrics)
+def read_hashing_metrics() -> Any:
+    """
+    Password hashing pool of this worker: queue depth, rejected operations
+    and hash latency (p50, p95) over the latest operations.
+    """
+    return hashing_executor.metrics()
+
+
+@router.get("/metrics/token-cache", response_model=schemas.TokenCacheMetrics)
+def read_token_cache_metrics() -> Any:
+    """
+    Verified-token cache of this worker: size, hits, misses, evictions and invalidations.
+    """
+    return token_cache.metrics()
@@ -3,12 +3,32 @@ from uuid import UUID
 
 from app import schemas, crud
 from app.api import deps
+from app.api.fast_json import FastJSONResponse, serialize_rows
+from app.core.config import settings
+from app.core.token_cache import CachedUser
 from app.db import models
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+USER_WEB_FIELDS = list(schemas.UserWeb.__fields__)
+USER_WEB_COLUMNS = [getattr(models.User, field) for field in USER_WEB_FIELDS]
+
+
+def read_users_batch(db: Session, ids: List[UUID]) -> schemas.UsersWebBatch:
+    if len(ids) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'At most {settings.BATCH_MAX_SIZE} users can be read at once.'
+        )
+
+    ids = list(dict.fromkeys(ids))
+    users = crud.user.get_multi_by_ids(db, ids=ids)
+
+    return schemas.UsersWebBatch(users=[users[id] for id in ids if id in users],
+                                 not_found=[id for id in ids if id not in users])
+
 
 @router.get("/",
             response_model=schemas.UsersWebInfo
@@ -17,23 +37,28 @@ def read_users(
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    user_id: Optional[List[UUID]] = Query(None)
+    user_id: Optional[List[UUID]] = Query(None),
+    count: Optional[schemas.CountMode] = None
 ) -> Any:
     """
     Retrieve users.
     """
-    users = crud.user.get_multi_filter(db, skip=skip, limit=limit, user_id=user_id)
+    users = crud.user.get_multi_filter(db, skip=skip, limit=limit, user_id=user_id,
+                                       columns=USER_WEB_COLUMNS if settings.FAST_RESPONSES else None)
 
-    total_count = crud.user.count(db)
+    total_count = crud.user.count(db, user_id=user_id, mode=count)
     info = schemas.Info(count=len(users), totalCount=total_count)
 
+    if settings.FAST_RESPONSES:
+        return FastJSONResponse(dict(users=serialize_rows(users, USER_WEB_FIELDS), info=info.dict()))
+
     return schemas.UsersWebInfo(users=users, info=info)
 
 
 @router.get("/me", response_model=schemas.User)
 def read_user_me(
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: CachedUser = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get current user.
@@ -41,6 +66,28 @@ def read_user_me(
     return current_user
 
 
+@router.get("/batch", response_model=schemas.UsersWebBatch)
+def read_users_by_ids(
+    db: Session = Depends(deps.get_db),
+    id: List[UUID] = Query(...)
+) -> Any:
+    """
+    Get many users at once, in the order of `id`.
+    """
+    return read_users_batch(db, id)
+
+
+@router.post("/batch", response_model=schemas.UsersWebBatch)
+def read_users_by_ids_in_body(
+    db: Session = Depends(deps.get_db),
+    ids: List[UUID] = Body(...)
+) -> Any:
+    """
+    Get many users at once, for lists of ids too long for a query string.
+    """
+    return read_users_batch(db, ids)
+
+
 @router.get("/{user_id}", response_model=schemas.UserWeb)
 def read_user_by_id(
     user_id: UUID,
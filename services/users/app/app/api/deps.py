@@ -9,7 +9,7 @@ from fastapi.security import OAuth2PasswordBearer
 from app import schemas, crud
 from app.core import security
 from app.core.config import settings
-from app.db import models
+from app.core.token_cache import token_cache, snapshot_user, CachedUser
 from app.db.session import SessionLocal
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -27,11 +27,14 @@ def get_db() -> Generator:
 
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+) -> CachedUser:
+    cached = token_cache.get(token)
+    if cached:
+        return cached[1]
+
+    generation = token_cache.generation()
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        payload = security.decode_access_token(token)
         token_data = schemas.TokenPayload(**payload)
     except (jwt.JWTError, ValidationError):
         raise HTTPException(
@@ -45,12 +48,15 @@ def get_current_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+
+    current_user = snapshot_user(user)
+    token_cache.put(token, payload, current_user, generation=generation)
+    return current_user
 
 
 def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: CachedUser = Depends(get_current_user),
+) -> CachedUser:
     if not crud.user.is_active(current_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,8 +66,8 @@ def get_current_active_user(
 
 
 def get_current_active_superuser(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: CachedUser = Depends(get_current_user),
+) -> CachedUser:
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
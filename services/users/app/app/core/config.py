@@ -12,6 +12,16 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     # 60 minutes * 24 hours * 7 days = 7 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+    # Refresh tokens issued at login get new access tokens without the password, each is used once
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # HS256 signs access tokens with SECRET_KEY. RS256 or ES256 sign them with the newest activated private key
+    # in JWT_KEYS_DIR, whose public keys are published at /.well-known/jwks.json for other services
+    JWT_ALGORITHM: str = "HS256"
+    JWT_KEYS_DIR: str = "/app/keys"
+    # Seconds for which other services may cache the published keys, and for which a new key is published before
+    # it signs tokens. Keep it well below the rotation interval
+    JWKS_MAX_AGE: int = 300
 
     ADMIN_EMAIL: EmailStr
     ADMIN_PASSWORD: str
@@ -21,6 +31,25 @@ class Settings(BaseSettings):
     POOL_MAX_OVERFLOW: int
     POOL_TIMEOUT: int
 
+    # Seconds for which total counts of list endpoints are cached with count=cached
+    COUNT_CACHE_TTL: int = 60
+
+    # Maximal number of ids looked up by a single batch request
+    BATCH_MAX_SIZE: int = 1000
+
+    # Serve list endpoints from plain rows encoded by orjson, skipping the validation against `response_model`
+    FAST_RESPONSES: bool = False
+
+    # Password hashing: processes of every worker, and the number of operations that may wait for one
+    # before requests are rejected with 503. Logins wait without holding a thread, so the limit may exceed
+    # the threadpool of the worker
+    HASHING_PROCESSES: int = 2
+    HASHING_QUEUE_LIMIT: int = 32
+
+    # Verified access tokens: seconds for which they are cached with their user, and the maximal number of them
+    TOKEN_CACHE_TTL: int = 30
+    TOKEN_CACHE_SIZE: int = 10000
+
     NUMBER_OF_USERS: int
 
     class Config:
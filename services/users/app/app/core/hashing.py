@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from app.core import security
+from app.core.config import settings
+
+
+class HashingQueueFull(Exception):
+    """
+    Raised instead of queueing a password hash when `queue_limit` operations are already waiting.
+    """
+
+
+def timed(function: Callable, *args) -> Tuple[Any, float]:
+    # Runs in a pool process, so that the time spent hashing is told apart from the time spent in the queue
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+class HashingExecutor:
+    def __init__(self, *, processes: int, queue_limit: int, latency_window: int = 1000):
+        """
+        Runs bcrypt in a pool of processes, so that a burst of logins doesn't hold the GIL
+        and the threadpool of the worker, which every other endpoint needs.
+
+        **Parameters**
+
+        * `processes`: Number of hashing processes of every worker of the service
+        * `queue_limit`: Maximal number of operations waiting for a free process, `HashingQueueFull` is raised above it
+        * `latency_window`: Number of latest operations the latency percentiles are computed from
+
+        The pool is started on first use, so gunicorn workers don't share it.
+        """
+        self.processes = processes
+        self.queue_limit = queue_limit
+
+        self._pool = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_seconds = deque(maxlen=latency_window)
+        self._total_seconds = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+
+    def verify_password(self, plain_password: str, password_hash: str) -> bool:
+        return self.run(security.verify_password, plain_password, password_hash)
+
+    def get_password_hash(self, password: str) -> str:
+        return self.run(security.get_password_hash, password)
+
+    async def verify_password_async(self, plain_password: str, password_hash: str) -> bool:
+        return await self.run_async(security.verify_password, plain_password, password_hash)
+
+    def run(self, function: Callable, *args) -> Any:
+        """
+        Blocks the calling thread until the operation is done, for scripts. Endpoints use `run_async`.
+        """
+        start = time.perf_counter()
+        future = self._submit(function, *args)
+        try:
+            result, hash_seconds = future.result()
+        finally:
+            self._done()
+
+        self._record(start, hash_seconds)
+        return result
+
+    async def run_async(self, function: Callable, *args) -> Any:
+        """
+        Awaits the operation without holding a thread: the threadpool of the worker (min(32, CPUs + 4)
+        threads) is smaller than the queue may get, and waiting on it would stall every sync endpoint.
+        """
+        start = time.perf_counter()
+        future = self._submit(function, *args)
+        try:
+            result, hash_seconds = await asyncio.wrap_future(future)
+        finally:
+            self._done()
+
+        self._record(start, hash_seconds)
+        return result
+
+    def _submit(self, function: Callable, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.processes + self.queue_limit:
+                self._rejected += 1
+                raise HashingQueueFull()
+
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            self._in_flight += 1
+
+        try:
+            return self._pool.submit(timed, function, *args)
+        except BaseException:
+            self._done()
+            raise
+
+    def _done(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record(self, start: float, hash_seconds: float) -> None:
+        with self._lock:
+            self._completed += 1
+            self._hash_seconds.append(hash_seconds)
+            self._total_seconds.append(time.perf_counter() - start)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight, completed, rejected = self._in_flight, self._completed, self._rejected
+            hash_seconds = list(self._hash_seconds)
+            total_seconds = list(self._total_seconds)
+
+        return dict(
+            processes=self.processes,
+            queue_limit=self.queue_limit,
+            queue_depth=max(in_flight - self.processes, 0),
+            in_flight=in_flight,
+            completed=completed,
+            rejected=rejected,
+            hash_ms_p50=percentile(hash_seconds, 50) * 1000,
+            hash_ms_p95=percentile(hash_seconds, 95) * 1000,
+            latency_ms_p50=percentile(total_seconds, 50) * 1000,
+            latency_ms_p95=percentile(total_seconds, 95) * 1000,
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+
+        if pool is not None:
+            pool.shutdown()
+
+
+hashing_executor = HashingExecutor(processes=settings.HASHING_PROCESSES, queue_limit=settings.HASHING_QUEUE_LIMIT)
@@ -0,0 +1,127 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+
+from app.core.config import settings
+
+# Key ids are the creation times of the keys, so that the newest key sorts last
+KID_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def key_created(kid: str) -> datetime:
+    return datetime.strptime(kid, KID_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    if algorithm == 'RS256':
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == 'ES256':
+        key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f'Unsupported signing algorithm: {algorithm}')
+
+    return key.private_bytes(encoding=serialization.Encoding.PEM, format=serialization.PrivateFormat.PKCS8,
+                             encryption_algorithm=serialization.NoEncryption())
+
+
+class SigningKeys:
+    def __init__(self, *, path: str, algorithm: str, activation_delay: float):
+        """
+        Private keys signing the access tokens, one PEM file per key in the `path` directory, named by key id.
+
+        **Parameters**
+
+        * `path`: Directory of the keys
+        * `algorithm`: JWS algorithm of the keys, RS256 or ES256
+        * `activation_delay`: Seconds for which a new key is published before it signs tokens
+
+        Tokens are signed with the newest key published for `activation_delay`, so that verifiers caching
+        the JWKS know it before they see a token signed with it. Older keys only verify tokens signed before
+        the rotation and are published in the JWKS until `rotate` removes them. The directory is read again
+        whenever it changes, so workers pick up a rotation without a restart.
+        """
+        self.path = path
+        self.algorithm = algorithm
+        self.activation_delay = timedelta(seconds=activation_delay)
+
+        self._keys = {}
+        self._public_keys = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Tuple[str, bytes]:
+        keys = self._load()
+        if not keys:
+            raise RuntimeError(f'No signing keys in {self.path}, create one with `python -m app.rotate_signing_key`')
+
+        # Until a key is old enough, e.g. the first key of the service, the oldest one signs
+        now = datetime.now(timezone.utc)
+        active = [kid for kid in keys if key_created(kid) + self.activation_delay <= now]
+        kid = max(active) if active else min(keys)
+        return kid, keys[kid]
+
+    def public_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        self._load()
+        return self._public_keys.get(kid)
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        self._load()
+        return {'keys': list(self._public_keys.values())}
+
+    def rotate(self, *, now: Optional[datetime] = None) -> str:
+        """
+        Add a new signing key and remove the keys which can no longer have signed an unexpired token.
+        """
+        now = now or datetime.now(timezone.utc)
+        kid = now.strftime(KID_FORMAT)
+
+        os.makedirs(self.path, exist_ok=True)
+        temporary_path = os.path.join(self.path, f'.{kid}.tmp')
+        with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as file:
+            file.write(generate_private_key(self.algorithm))
+        os.replace(temporary_path, os.path.join(self.path, f'{kid}.pem'))
+
+        # A key stops signing when its successor is activated, tokens it signed expire at most that long after
+        token_lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        kids = sorted(self._read())
+        for old_kid, successor in zip(kids, kids[1:]):
+            if key_created(successor) + self.activation_delay + token_lifetime < now:
+                os.remove(os.path.join(self.path, f'{old_kid}.pem'))
+
+        return kid
+
+    def _load(self) -> Dict[str, bytes]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        with self._lock:
+            if mtime != self._mtime:
+                self._keys = self._read()
+                self._public_keys = {kid: self._public_jwk(kid, key) for kid, key in self._keys.items()}
+                self._mtime = mtime
+
+            return self._keys
+
+    def _read(self) -> Dict[str, bytes]:
+        keys = {}
+        for name in os.listdir(self.path):
+            if name.endswith('.pem'):
+                with open(os.path.join(self.path, name), 'rb') as file:
+                    keys[name[:-len('.pem')]] = file.read()
+
+        return keys
+
+    def _public_jwk(self, kid: str, private_key: bytes) -> Dict[str, Any]:
+        public_key = jwk.construct(private_key, self.algorithm).public_key().to_dict()
+        return {**public_key, 'kid': kid, 'use': 'sig', 'alg': self.algorithm}
+
+
+signing_keys = SigningKeys(path=settings.JWT_KEYS_DIR, algorithm=settings.JWT_ALGORITHM,
+                           activation_delay=settings.JWKS_MAX_AGE)
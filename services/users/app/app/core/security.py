@@ -1,8 +1,11 @@
+import hashlib
+import secrets
 from datetime import datetime, timedelta,timezone
-from typing import Any, Union
+from typing import Any, Dict, Union
 
 from app.core.config import settings
-from jose import jwt
+from app.core.keys import signing_keys
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -21,14 +24,39 @@ def create_access_token(
         )
 
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    if settings.JWT_ALGORITHM == ALGORITHM:
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+    # The key id tells verifiers which key of the JWKS signed the token
+    kid, key = signing_keys.current()
+    encoded_jwt = jwt.encode(to_encode, key, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
 
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    if settings.JWT_ALGORITHM == ALGORITHM:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+
+    key = signing_keys.public_key(jwt.get_unverified_header(token).get("kid"))
+    if key is None:
+        raise JWTError("Unknown signing key")
+
+    return jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+
+
 def verify_password(plain_password: str, password_hash: str) -> bool:
     return pwd_context.verify(plain_password, password_hash)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def create_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random 256-bit values, which can't be guessed from a fast hash the way passwords can
+    return hashlib.sha256(token.encode()).hexdigest()
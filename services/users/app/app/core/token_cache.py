@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+
+# Fields of a user needed by the endpoints depending on `get_current_user`, without the password hash
+CachedUser = namedtuple('CachedUser', ['id', 'email', 'name', 'login', 'avatar_url', 'is_active', 'is_superuser'])
+
+
+def snapshot_user(user) -> CachedUser:
+    return CachedUser(**{field: getattr(user, field) for field in CachedUser._fields})
+
+
+class TokenCache:
+    def __init__(self, *, ttl: float, max_size: int):
+        """
+        Verified access tokens with their decoded payload and a snapshot of the user, by token.
+
+        **Parameters**
+
+        * `ttl`: Seconds for which a verified token is trusted, 0 disables caching
+        * `max_size`: Maximal number of cached tokens, the least recently used ones are evicted
+
+        An entry expires with its token (`exp`) or after `ttl`, whichever comes first. Writers call
+        `invalidate_user` after every change of a user. The cache is local to the worker process,
+        other workers see the change after `ttl` seconds at most.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._cache = OrderedDict()
+        self._tokens_by_user = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], CachedUser]]:
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+
+            self._cache.move_to_end(token)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def generation(self) -> int:
+        """
+        To be read before the user is, `put` then skips snapshots which may predate a change of a user.
+        """
+        return self._generation
+
+    def put(self, token: str, payload: Dict[str, Any], user: CachedUser, *, generation: int) -> None:
+        if not self.ttl:
+            return
+
+        expires = min(time.time() + self.ttl, payload.get('exp', float('inf')))
+
+        with self._lock:
+            if generation != self._generation:
+                return
+
+            self._remove(token)
+            self._cache[token] = (payload, user, expires)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._cache) > self.max_size:
+                self._remove(next(iter(self._cache)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        with self._lock:
+            self._generation += 1
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self.invalidations += 1
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(size=len(self._cache), max_size=self.max_size, hits=self.hits, misses=self.misses,
+                        evictions=self.evictions, invalidations=self.invalidations)
+
+    def _remove(self, token: str) -> None:
+        entry = self._cache.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user[entry[1].id]
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+
+token_cache = TokenCache(ttl=settings.TOKEN_CACHE_TTL, max_size=settings.TOKEN_CACHE_SIZE)
@@ -1 +1,2 @@
 from .crud_user import user
+from .crud_refresh_token import refresh_token
@@ -0,0 +1,86 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.db.models import RefreshToken, User
+
+
+class CRUDRefreshToken:
+    def __init__(self, model=RefreshToken):
+        self.model = model
+
+    def issue(self, db: Session, *, user_id: UUID, family_id: Optional[UUID] = None) -> str:
+        """
+        Store a new refresh token of `user_id` and return it, a new login starts a new family.
+        Expired tokens of the user are removed on the way.
+        """
+        now = datetime.utcnow()
+        token = security.create_refresh_token()
+
+        db.query(self.model).filter(RefreshToken.user_id == user_id, RefreshToken.expires < now) \
+            .delete(synchronize_session=False)
+        db.add(RefreshToken(
+            token_hash=security.hash_refresh_token(token),
+            user_id=user_id,
+            family_id=family_id or uuid.uuid4(),
+            created=now,
+            expires=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        db.commit()
+        return token
+
+    def rotate(self, db: Session, *, token: str) -> Optional[Tuple[User, str]]:
+        """
+        Revoke `token` and issue its successor, returning the user and the new token.
+
+        A token is used once. Presenting a revoked token means that it leaked, or that its successor did,
+        so every token of the family is revoked and the client has to log in with the password again.
+        """
+        row = db.query(RefreshToken, User).join(User, User.id == RefreshToken.user_id) \
+            .filter(RefreshToken.token_hash == security.hash_refresh_token(token)) \
+            .with_for_update(of=RefreshToken).first()
+        if row is None:
+            db.rollback()
+            return None
+
+        refresh_token, user = row
+        if refresh_token.revoked:
+            self._revoke_family(db, family_id=refresh_token.family_id)
+            return None
+        if refresh_token.expires <= datetime.utcnow() or not user.is_active:
+            db.rollback()
+            return None
+
+        refresh_token.revoked = True
+        return user, self.issue(db, user_id=user.id, family_id=refresh_token.family_id)
+
+    def revoke(self, db: Session, *, token: str) -> bool:
+        """
+        Revoke the family of `token`, that is the session it belongs to.
+        """
+        refresh_token = db.query(self.model) \
+            .filter(RefreshToken.token_hash == security.hash_refresh_token(token)).first()
+        if refresh_token is None:
+            return False
+
+        self._revoke_family(db, family_id=refresh_token.family_id)
+        return True
+
+    def revoke_user(self, db: Session, *, user_id: UUID) -> int:
+        revoked = db.query(self.model).filter(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False)) \
+            .update({RefreshToken.revoked: True}, synchronize_session=False)
+        db.commit()
+        return revoked
+
+    def _revoke_family(self, db: Session, *, family_id: UUID) -> None:
+        db.query(self.model).filter(RefreshToken.family_id == family_id) \
+            .update({RefreshToken.revoked: True}, synchronize_session=False)
+        db.commit()
+
+
+refresh_token = CRUDRefreshToken(RefreshToken)
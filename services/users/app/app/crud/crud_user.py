@@ -1,12 +1,19 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
 from uuid import UUID
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
+from app.crud.total_count import TotalCounter, estimate_count
 from app.db.models import User
-from app.schemas import UserCreate, UserUpdate
+from app.schemas import UserCreate, UserUpdate, CountMode
 from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.core.security import get_password_hash, verify_password
+from fastapi.concurrency import run_in_threadpool
+from app.core.hashing import hashing_executor
+from app.core.token_cache import token_cache
+
+# Totals of whole tables may lag behind by COUNT_CACHE_TTL, unless asked for with count=exact
+users_counter = TotalCounter(default_mode=CountMode.cached, ttl=settings.COUNT_CACHE_TTL)
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -19,7 +26,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
         db_obj = User(
             email=obj_in.email,
-            password_hash=get_password_hash(obj_in.email + obj_in.password),
+            password_hash=hashing_executor.get_password_hash(obj_in.email + obj_in.password),
             name=obj_in.name,
             login=obj_in.login,
             avatar_url=obj_in.avatar_url,
@@ -28,14 +35,42 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         )
         db.add(db_obj)
         db.commit()
+        users_counter.invalidate()
         db.refresh(db_obj)
         return db_obj
 
+    def update(self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]) -> User:
+        user = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        # Cached tokens hold a snapshot of the user, which may now be deactivated
+        token_cache.invalidate_user(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: UUID) -> User:
+        user = super().remove(db, id=id)
+        token_cache.invalidate_user(id)
+        users_counter.invalidate()
+        return user
+
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(user.email + password, user.password_hash):
+        if not hashing_executor.verify_password(user.email + password, user.password_hash):
+            return None
+        return user
+
+    def get_by_email_releasing(self, db: Session, *, email: str) -> Optional[User]:
+        # Closing returns the connection to the pool, rather than holding it while the password waits for a process
+        try:
+            return self.get_by_email(db, email=email)
+        finally:
+            db.close()
+
+    async def authenticate_async(self, db: Session, *, email: str, password: str) -> Optional[User]:
+        user = await run_in_threadpool(self.get_by_email_releasing, db, email=email)
+        if not user:
+            return None
+        if not await hashing_executor.verify_password_async(user.email + password, user.password_hash):
             return None
         return user
 
@@ -45,15 +80,29 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def is_superuser(self, user: User) -> bool:
         return user.is_superuser
 
-    def get_multi_filter(self, db: Session, *, skip: int, limit: int, user_id: Optional[List[UUID]] = None):
+    def get_multi_filter(self, db: Session, *, skip: int, limit: int, user_id: Optional[List[UUID]] = None,
+                         columns: Optional[List] = None):
+        # Selected `columns` are returned as plain tuples, which are cheaper to load than `User` objects
+        query = db.query(*(columns or [self.model]))
         if user_id:
-            return db.query(self.model).filter(User.id.in_(user_id)) \
+            return query.filter(User.id.in_(user_id)) \
                 .offset(skip).limit(limit).all()
         else:
-            return db.query(self.model).offset(skip).limit(limit).all()
-        
-    def count(self, db: Session) -> int:
-        return db.query(func.count(User.id)).first()[0]
+            return query.offset(skip).limit(limit).all()
+
+    def count(self, db: Session, *, user_id: Optional[List[UUID]] = None,
+              mode: Optional[CountMode] = None) -> Optional[int]:
+        if user_id:
+            query = db.query(User.id).filter(User.id.in_(user_id))
+        else:
+            query = db.query(User.id)
+
+        return users_counter.count(
+            mode=mode,
+            key=tuple(sorted(user_id or [])),
+            exact=lambda: query.with_entities(func.count(User.id)).scalar(),
+            estimate=lambda: estimate_count(db, query)
+        )
 
 
 user = CRUDUser(User)
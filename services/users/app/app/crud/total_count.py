@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.schemas import CountMode
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def compile_explain(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) ' + compiler.process(element.statement, **kw)
+
+
+def estimate_count(db: Session, query: Query) -> int:
+    """
+    Number of rows the Postgres planner expects `query` to return, based on table statistics.
+    """
+    plan = db.execute(Explain(query.statement)).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class TotalCounter:
+    def __init__(self, *, default_mode: CountMode = CountMode.exact, ttl: float = 0,
+                 max_size: int = 1024, exact_threshold: int = 1000):
+        """
+        Fills `Info.totalCount` of a list endpoint according to a `CountMode`.
+
+        **Parameters**
+
+        * `default_mode`: Mode used when the client does not ask for one
+        * `ttl`: Seconds for which counts of the `cached` mode are kept, 0 disables caching
+        * `max_size`: Maximal number of cached counts (e.g. different filters)
+        * `exact_threshold`: Estimates below it are replaced with cached counts, which are cheap there
+
+        `exact` always counts the rows. Cached counts are dropped by `invalidate`, which writers call
+        after every change. The cache is local to the worker process, other workers catch up after `ttl` seconds.
+        """
+        self.default_mode = default_mode
+        self.ttl = ttl
+        self.max_size = max_size
+        self.exact_threshold = exact_threshold
+        self._cache = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def count(self, *, mode: Optional[CountMode], exact: Callable[[], int], estimate: Callable[[], int],
+              key: Hashable = None) -> Optional[int]:
+        mode = mode or self.default_mode
+
+        if mode == CountMode.none:
+            return None
+
+        if mode == CountMode.estimate:
+            estimated = estimate()
+            if estimated >= self.exact_threshold:
+                return estimated
+
+        if mode == CountMode.exact:
+            return exact()
+
+        # Cached mode, or an estimate small enough to be counted
+        return self._count_cached(key, exact)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _count_cached(self, key: Hashable, exact: Callable[[], int]) -> int:
+        if not self.ttl:
+            return exact()
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[1] > now:
+                self._cache.move_to_end(key)
+                return cached[0]
+            generation = self._generation
+
+        value = exact()
+
+        with self._lock:
+            # Don't cache a count that may have been computed before a write
+            if generation != self._generation:
+                return value
+
+            self._cache[key] = (value, now + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return value
@@ -3,3 +3,4 @@
 
 from app.db.base_class import Base  # noqa
 from app.db.models.user import User  # noqa
+from app.db.models.refresh_token import RefreshToken  # noqa
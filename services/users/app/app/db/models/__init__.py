@@ -1 +1,2 @@
 from .user import User
+from .refresh_token import RefreshToken
@@ -0,0 +1,17 @@
+import uuid
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
+
+from app.db.base_class import Base
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class RefreshToken(Base):
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    # SHA-256 of the token, the token itself is only known to the client
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('user.id', ondelete='CASCADE'), index=True, nullable=False)
+    # Tokens rotated from the same login, revoked together when a rotated token is used again
+    family_id = Column(UUID(as_uuid=True), index=True, nullable=False)
+    created = Column(DateTime, nullable=False)
+    expires = Column(DateTime, nullable=False)
+    revoked = Column(Boolean(), default=False, nullable=False)
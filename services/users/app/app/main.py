@@ -1,10 +1,12 @@
 import os
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.api.api.api import api_router
+from app.core.hashing import hashing_executor, HashingQueueFull
 
 app = FastAPI(title=settings.SERVICE_NAME,
               openapi_url=f"{settings.API_USERS}/openapi.json")
@@ -24,3 +26,16 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix=settings.API_USERS)
+
+
+@app.exception_handler(HashingQueueFull)
+def reject_hashing(request: Request, exc: HashingQueueFull):
+    # Failing fast keeps a burst of logins from queueing up behind bcrypt
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={"detail": "Too many password operations in progress, try again later."},
+                        headers={"Retry-After": "1"})
+
+
+@app.on_event("shutdown")
+def shutdown_hashing_executor():
+    hashing_executor.shutdown()
@@ -0,0 +1,29 @@
+import logging
+import sys
+
+from app.core import security
+from app.core.config import settings
+from app.core.keys import signing_keys
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    if settings.JWT_ALGORITHM == security.ALGORITHM:
+        logger.info("Access tokens are signed with the shared secret, there are no keys to rotate")
+        return
+
+    # `--if-missing` only creates the first key, so that restarting the service doesn't rotate it
+    if "--if-missing" in sys.argv[1:] and signing_keys.jwks()["keys"]:
+        logger.info(f"Signing key found in {signing_keys.path}")
+        return
+
+    logger.info("Rotating the access token signing key")
+    kid = signing_keys.rotate()
+    logger.info(f"Key {kid} is published and signs access tokens in {settings.JWKS_MAX_AGE} seconds, "
+                f"or now if it is the first one")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,4 @@
-from .user import User, UserCreate, UserUpdate, UserWeb, UsersWebInfo, Info
-from .token import Token, TokenPayload
+from .user import User, UserCreate, UserUpdate, UserWeb, UsersWebInfo, UsersWebBatch, Info
+from .token import Token, TokenPayload, TokenCacheMetrics, RefreshTokenRequest
+from .count import CountMode
+from .hashing import HashingMetrics
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class HashingMetrics(BaseModel):
+    processes: int
+    queue_limit: int
+    queue_depth: int
+    in_flight: int
+    completed: int
+    rejected: int
+    hash_ms_p50: float
+    hash_ms_p95: float
+    latency_ms_p50: float
+    latency_ms_p95: float
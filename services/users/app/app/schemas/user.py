@@ -6,7 +6,7 @@ from uuid import UUID
 
 class Info(BaseModel):
     count: int
-    totalCount: int
+    totalCount: Optional[int]
 
 
 class UserBase(BaseModel):
@@ -49,3 +49,8 @@ class UsersWebInfo(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class UsersWebBatch(BaseModel):
+    users: List[UserWeb]
+    not_found: List[UUID]
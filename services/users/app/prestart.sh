@@ -7,4 +7,7 @@ python /app/app/user_pre_start.py
 alembic upgrade head
 
 # Create initial data in DB
-python /app/app/initial_data.py
\ No newline at end of file
+python /app/app/initial_data.py
+
+# Create the first access token signing key, if tokens are signed with RS256 or ES256
+python /app/app/rotate_signing_key.py --if-missing
\ No newline at end of file